@@ -0,0 +1,205 @@
+"""
+Allocation budget instrumentation for the per-note hot path.
+Wraps named stages (methods on their classes) and attributes allocations to
+each call with tracemalloc: peak bytes allocated during the call and blocks
+still allocated after it. Nested stages are accounted to both the inner and
+the outer stage. A gc callback records collections and pause times.
+
+    profiler = AllocationProfiler()
+    with profiler:
+        ...drive messages...
+    profiler.check(BUDGETS)  # raises AllocationBudgetExceeded
+"""
+
+import functools
+import gc
+import importlib
+import sys
+import time
+import tracemalloc
+from metrics import Histogram
+
+# Stages of the note path, "module:Class.method"
+STAGES = (
+    "midi_service:MidiService._process_with_handler",
+    "harmonic_processor:HarmonicProcessor.process",
+    "presentation_service:PresentationService.snapshot_midi_event",
+    "presentation_service:PresentationService.format_midi_event",
+    "presentation_service:PresentationService.render_markup",
+    "presentation_service:PresentationService.render",
+    "ui_service:UIService.update_midi_status",
+    "ui_service:UIService.flush",
+    "ui_service:UIService.write",
+)
+
+# Per-call budgets, stage -> (peak bytes, retained blocks). Retained blocks
+# include the returned object and are what the GC eventually deals with,
+# peak bytes are what the allocator churns through
+BUDGETS = {
+    "MidiService._process_with_handler": (1024, 8),
+    "HarmonicProcessor.process": (64, 1),
+    "PresentationService.snapshot_midi_event": (512, 4),
+    "PresentationService.render": (2048, 2),
+    "UIService.update_midi_status": (256, 2),
+}
+
+
+class AllocationBudgetExceeded(AssertionError):
+    """A stage allocated more per call than its declared budget"""
+
+
+class StageStats:
+    __slots__ = ("calls", "bytes", "max_bytes", "blocks", "max_blocks")
+
+    def __init__(self):
+        self.calls = 0
+        self.bytes = 0
+        self.max_bytes = 0
+        self.blocks = 0
+        self.max_blocks = 0
+
+    def summary(self, bias=(0, 0)):
+        """Per-call figures, less the measuring overhead of an empty call"""
+        calls = self.calls or 1
+        bias_bytes, bias_blocks = bias
+        return {
+            "calls": self.calls,
+            "bytes_per_call": max(0.0, self.bytes / calls - bias_bytes),
+            "max_bytes": max(0, self.max_bytes - bias_bytes),
+            "blocks_per_call": max(0.0, self.blocks / calls - bias_blocks),
+            "max_blocks": max(0, self.max_blocks - bias_blocks),
+        }
+
+
+class AllocationProfiler:
+    def __init__(self, stages=STAGES):
+        self.stages = stages
+        self.stats = {}
+        self._patched = []
+        # Peak bytes seen by the enclosing stages, reset_peak() is global
+        self._peaks = []
+        self.gc_pauses = {generation: Histogram() for generation in range(3)}
+        self._gc_start = 0
+        # Allocations of the wrapper itself around an empty call
+        self.bias = (0, 0)
+        self.started = 0
+        self.elapsed = 0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        for stage in self.stages:
+            module_name, qualname = stage.split(":")
+            try:
+                module = importlib.import_module(module_name)
+            except ImportError as e:
+                print(f"[alloc] Skipping {qualname}: {e}")
+                continue
+            class_name, method_name = qualname.split(".")
+            cls = getattr(module, class_name)
+            original = cls.__dict__[method_name]
+            self.stats[qualname] = StageStats()
+            setattr(cls, method_name, self._wrap(original, self.stats[qualname]))
+            self._patched.append((cls, method_name, original))
+
+        gc.callbacks.append(self._on_gc)
+        tracemalloc.start()
+        self._calibrate()
+        self.started = time.perf_counter()
+
+    def _calibrate(self, calls=1000):
+        stats = StageStats()
+        empty = self._wrap(lambda: None, stats)
+        for _ in range(calls):
+            empty()
+        # Smallest overhead seen, so no real allocation is hidden
+        self.bias = (
+            min(stats.bytes // calls, stats.max_bytes),
+            min(stats.blocks // calls, stats.max_blocks),
+        )
+
+    def stop(self):
+        self.elapsed = time.perf_counter() - self.started
+        tracemalloc.stop()
+        gc.callbacks.remove(self._on_gc)
+        for cls, method_name, original in reversed(self._patched):
+            setattr(cls, method_name, original)
+        self._patched = []
+
+    def _wrap(self, func, stats):
+        peaks = self._peaks
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            current, peak = tracemalloc.get_traced_memory()
+            if peaks:
+                peaks[-1] = max(peaks[-1], peak)
+            peaks.append(0)
+            tracemalloc.reset_peak()
+            blocks = sys.getallocatedblocks()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                retained = sys.getallocatedblocks() - blocks
+                after, peak = tracemalloc.get_traced_memory()
+                peak = max(peaks.pop(), peak)
+                allocated = peak - current
+                stats.calls += 1
+                stats.bytes += allocated
+                stats.blocks += retained
+                if allocated > stats.max_bytes:
+                    stats.max_bytes = allocated
+                if retained > stats.max_blocks:
+                    stats.max_blocks = retained
+                if peaks:
+                    peaks[-1] = max(peaks[-1], peak)
+
+        return wrapper
+
+    def _on_gc(self, phase, info):
+        if phase == "start":
+            self._gc_start = time.perf_counter_ns()
+        else:
+            self.gc_pauses[info["generation"]].record(
+                time.perf_counter_ns() - self._gc_start
+            )
+
+    def report(self):
+        """Per-stage allocations per call, GC collections/s and pauses (us)"""
+        elapsed = self.elapsed or (time.perf_counter() - self.started)
+        return {
+            "stages": {
+                name: stats.summary(self.bias) for name, stats in self.stats.items()
+            },
+            "gc": {
+                generation: dict(
+                    histogram.summary(),
+                    per_second=histogram.count / elapsed if elapsed else 0,
+                )
+                for generation, histogram in self.gc_pauses.items()
+            },
+        }
+
+    def check(self, budgets=BUDGETS):
+        """Raise AllocationBudgetExceeded if a stage's average is over budget"""
+        failures = []
+        for name, (max_bytes, max_blocks) in budgets.items():
+            stats = self.stats.get(name)
+            if stats is None or not stats.calls:
+                continue
+            summary = stats.summary(self.bias)
+            if summary["bytes_per_call"] > max_bytes:
+                failures.append(
+                    f"{name}: {summary['bytes_per_call']:.0f} bytes/call > {max_bytes}"
+                )
+            if summary["blocks_per_call"] > max_blocks:
+                failures.append(
+                    f"{name}: {summary['blocks_per_call']:.2f} blocks/call > {max_blocks}"
+                )
+        if failures:
+            raise AllocationBudgetExceeded("; ".join(failures))
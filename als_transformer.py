@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Ableton Live set (.als) clip transformer.
+Stream-parses the gzipped XML of each set with an incremental pull parser,
+runs the notes of every MIDI clip through a HarmonicProcessor per track (in
+time order, like live playback) and writes a new .als. Everything outside
+the clips' KeyTracks is copied through byte for byte. Directories of sets are
+processed across a process pool, with per-file timing.
+
+    python als_transformer.py "Test Project" -o transformed/ --jobs 4
+"""
+
+import argparse
+import gzip
+import os
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from xml.sax.saxutils import quoteattr
+from harmonic_processor import HarmonicProcessor
+
+
+def read_clip_notes(key_tracks):
+    """Notes of a clip's KeyTracks element as (key, attributes), in time order"""
+    notes = []
+    for key_track in key_tracks.iter("KeyTrack"):
+        key = int(key_track.find("MidiKey").get("Value"))
+        for event in key_track.iter("MidiNoteEvent"):
+            notes.append((key, dict(event.attrib)))
+    notes.sort(key=lambda note: (float(note[1]["Time"]), note[0]))
+    return notes
+
+
+def write_key_tracks(notes, track_ids, indent, newline):
+    """Serialize notes grouped by key as KeyTracks lines, in Live's layout"""
+    by_key = {}
+    for key, attributes in notes:
+        by_key.setdefault(key, []).append(attributes)
+
+    # Reuse the clip's KeyTrack ids, continuing after the largest for new keys
+    ids = sorted(track_ids)
+    next_id = (ids[-1] + 1) if ids else 0
+    while len(ids) < len(by_key):
+        ids.append(next_id)
+        next_id += 1
+
+    lines = [f"{indent}<KeyTracks>{newline}"]
+    for track_id, key in zip(ids, sorted(by_key)):
+        lines.append(f'{indent}\t<KeyTrack Id="{track_id}">{newline}')
+        lines.append(f"{indent}\t\t<Notes>{newline}")
+        for attributes in sorted(by_key[key], key=lambda a: float(a["Time"])):
+            attrs = " ".join(
+                f"{name}={quoteattr(value)}" for name, value in attributes.items()
+            )
+            lines.append(f"{indent}\t\t\t<MidiNoteEvent {attrs} />{newline}")
+        lines.append(f"{indent}\t\t</Notes>{newline}")
+        lines.append(f'{indent}\t\t<MidiKey Value="{key}" />{newline}')
+        lines.append(f"{indent}\t</KeyTrack>{newline}")
+    lines.append(f"{indent}</KeyTracks>{newline}")
+    return lines
+
+
+def transform_notes(notes, processor):
+    """Map each note's key through the processor, in time order"""
+    transformed = []
+    for key, attributes in notes:
+        new_key = processor.process(key)
+        # Same as live: an out of range result leaves the note unchanged
+        transformed.append((new_key if 0 <= new_key <= 127 else key, attributes))
+    return transformed
+
+
+def transform_set(in_path, out_path, n_harmonics=8):
+    """
+    Transform one set. Lines are fed to an XMLPullParser one at a time and
+    finished elements are cleared, so memory is bounded by the largest clip.
+    Returns counts of MIDI tracks, clips and notes.
+    """
+    parser = ET.XMLPullParser(events=("start", "end"))
+    stats = {"tracks": 0, "clips": 0, "notes": 0}
+    processors = {}
+    track = None
+    capture = None  # Output lines of the KeyTracks element being read
+
+    with gzip.open(in_path, "rt", encoding="utf-8", newline="") as infile, gzip.open(
+        out_path, "wt", encoding="utf-8", newline=""
+    ) as outfile:
+        for line in infile:
+            parser.feed(line)
+            for event, elem in parser.read_events():
+                if event == "start":
+                    if elem.tag == "MidiTrack":
+                        track = elem.get("Id")
+                        stats["tracks"] += 1
+                    elif elem.tag == "KeyTracks" and track is not None:
+                        capture = []
+                    continue
+
+                if elem.tag == "KeyTracks" and capture is not None:
+                    capture.append(line)
+                    lines = capture
+                    capture = None
+                    stripped = lines[0].strip()
+                    if (
+                        stripped == "<KeyTracks>"
+                        and lines[-1].strip() == "</KeyTracks>"
+                    ):
+                        processor = processors.get(track)
+                        if processor is None:
+                            processor = HarmonicProcessor(n_harmonics=n_harmonics)
+                            processors[track] = processor
+                        notes = read_clip_notes(elem)
+                        track_ids = [int(k.get("Id")) for k in elem.iter("KeyTrack")]
+                        indent = lines[0][: len(lines[0]) - len(lines[0].lstrip())]
+                        newline = lines[0][len(lines[0].rstrip("\r\n")) :]
+                        lines = write_key_tracks(
+                            transform_notes(notes, processor),
+                            track_ids,
+                            indent,
+                            newline,
+                        )
+                        stats["clips"] += 1
+                        stats["notes"] += len(notes)
+                    # Otherwise the layout is not Live's, leave the clip unchanged
+                    outfile.writelines(lines)
+                    line = None
+                elif elem.tag == "MidiTrack":
+                    track = None
+
+                # Finished elements are not needed again
+                if capture is None:
+                    elem.clear()
+
+            if line is not None:
+                if capture is not None:
+                    capture.append(line)
+                else:
+                    outfile.write(line)
+        parser.close()
+
+    return stats
+
+
+def transform_file(in_path, out_path, n_harmonics):
+    """Process pool worker: transform one set and time it"""
+    start = time.perf_counter()
+    stats = transform_set(in_path, out_path, n_harmonics)
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+
+def find_sets(paths):
+    """Expand directories into the .als files they contain (skipping Backup folders)"""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs[:] = [d for d in dirs if d != "Backup"]
+                for name in sorted(files):
+                    if name.lower().endswith(".als"):
+                        yield os.path.join(root, name), os.path.relpath(
+                            os.path.join(root, name), path
+                        )
+        else:
+            yield path, os.path.basename(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("inputs", nargs="+", help=".als files or directories")
+    parser.add_argument(
+        "-o", "--output", default="transformed", help="output directory"
+    )
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count())
+    parser.add_argument("--harmonics", type=int, default=8)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    failed = 0
+    notes = 0
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        futures = {}
+        for in_path, rel_path in find_sets(args.inputs):
+            out_path = os.path.join(args.output, rel_path)
+            os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+            futures[pool.submit(transform_file, in_path, out_path, args.harmonics)] = (
+                in_path
+            )
+
+        for future in as_completed(futures):
+            in_path = futures[future]
+            try:
+                stats = future.result()
+            except Exception as e:
+                print(f"[als] {in_path}: error: {e!r}")
+                failed += 1
+                continue
+            notes += stats["notes"]
+            print(
+                f"[als] {in_path}: {stats['tracks']} MIDI tracks, {stats['clips']} clips, "
+                f"{stats['notes']} notes in {stats['seconds'] * 1000:.1f} ms"
+            )
+
+    print(
+        f"[als] Total: {len(futures)} sets, {notes} notes in "
+        f"{time.perf_counter() - start:.2f} s, {failed} failed"
+    )
+
+
+if __name__ == "__main__":
+    main()
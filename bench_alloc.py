@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Allocation budget benchmark for the per-note hot path.
+Drives note-on/off pairs through MidiService and the display path (UIService
+with a null window when webview is installed, the presentation service's
+render otherwise) under AllocationProfiler, and prints allocations per call
+for each stage plus GC collections and pauses. With --check it exits non-zero
+when a stage is over its budget in alloc_profile.BUDGETS.
+
+    python bench_alloc.py --messages 20000 --check
+"""
+
+import argparse
+import mido
+from alloc_profile import AllocationBudgetExceeded, AllocationProfiler
+from midi_service import MidiService
+
+
+class NullWindow:
+    """Stands in for the webview window, discards UI updates"""
+
+    def run_js(self, script):
+        pass
+
+
+class NullPort:
+    def send(self, msg):
+        pass
+
+
+def display_sink(service):
+    """UI callback and per-frame flush for the display path"""
+    try:
+        from ui_service import UIService
+    except ImportError:
+        ui = None
+    else:
+        ui = UIService(service.presentation_service)
+        ui.set_window(NullWindow())
+        return ui.update_midi_status, ui.flush
+
+    pending = []
+
+    def update(msg, display_data, channel):
+        pending.append(display_data)
+
+    def flush():
+        for display_data in pending:
+            service.presentation_service.render(display_data)
+        pending.clear()
+
+    return update, flush
+
+
+def run(count, frame=64):
+    service = MidiService(metrics=False)
+    service.outport = NullPort()
+    update, flush = display_sink(service)
+    service.set_ui_callback(update)
+
+    messages = []
+    for i in range(count // 2):
+        note = 36 + (i * 7) % 48
+        messages.append(mido.Message("note_on", channel=i % 4, note=note, velocity=100))
+        messages.append(mido.Message("note_off", channel=i % 4, note=note, velocity=0))
+
+    profiler = AllocationProfiler()
+    with profiler:
+        for i, msg in enumerate(messages):
+            service._process_message(msg)
+            if i % frame == frame - 1:
+                flush()
+        flush()
+    return profiler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=20_000)
+    parser.add_argument(
+        "--check", action="store_true", help="fail when a stage is over budget"
+    )
+    args = parser.parse_args()
+
+    profiler = run(args.messages)
+    report = profiler.report()
+    for name, s in report["stages"].items():
+        if not s["calls"]:
+            continue
+        print(
+            f"[alloc] {name:>40}: {s['calls']:>7} calls | "
+            f"{s['bytes_per_call']:>8.1f} B/call (max {s['max_bytes']}) | "
+            f"{s['blocks_per_call']:>5.2f} blocks/call retained (max {s['max_blocks']})"
+        )
+    for generation, g in report["gc"].items():
+        print(
+            f"[alloc] gc gen {generation}: {g['count']} collections "
+            f"({g['per_second']:.1f}/s) | pause p50 {g['p50']:.1f} "
+            f"p99 {g['p99']:.1f} max {g['max']:.1f} us"
+        )
+
+    if args.check:
+        try:
+            profiler.check()
+        except AllocationBudgetExceeded as e:
+            print(f"[alloc] Over budget: {e}")
+            raise SystemExit(1)
+        print("[alloc] All stages within budget")
+
+
+if __name__ == "__main__":
+    main()
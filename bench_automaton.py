@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Equivalence check and step benchmark for the compiled counting automaton.
+Runs CountingAutomaton and CompiledAutomaton side by side over long runs,
+including random automata using the * and / operators, and fails loudly on
+the first value that is not bit-identical.
+
+    python bench_automaton.py --steps 1000000 --random 200
+"""
+
+import argparse
+import random
+import time
+from counting_automaton import CountingAutomaton
+
+
+def same(a, b):
+    """Bit-identical comparison (repr round-trips floats, nan and -0.0 included)"""
+    return type(a) is type(b) and repr(a) == repr(b)
+
+
+def random_automaton(rng, operators):
+    """Automaton described with random states and transitions"""
+    count = rng.randint(1, 6)
+    return CountingAutomaton(
+        {
+            "states": [
+                {
+                    "threshold": rng.randint(1, 4),
+                    "operator": rng.choice(operators),
+                    "operand": rng.randint(1, 9),
+                }
+                for _ in range(count)
+            ],
+            "transitions": [rng.randrange(count) for _ in range(count)],
+        }
+    )
+
+
+# States with equal fields but their own transitions, with its known start
+DUPLICATE_STATES = {
+    "states": [
+        {"threshold": 1, "operator": "+", "operand": 1},
+        {"threshold": 1, "operator": "+", "operand": 10},
+        {"threshold": 1, "operator": "+", "operand": 1},
+    ],
+    "transitions": [1, 2, 0],
+}
+DUPLICATE_STATES_START = [10, 11, 12, 22, 23, 24]
+
+
+def verify(make, steps, rng):
+    """Compare step(), advance(n) and peek(k) against the reference"""
+    reference = make()
+    compiled = make().compile()
+    jumper = make().compile()
+    for i in range(steps):
+        expected = reference.step()
+        if not same(compiled.step(), expected):
+            raise AssertionError(f"step {i}: {compiled.value!r} != {expected!r}")
+        # __str__ formats the value with :02d, so only integer values render
+        if type(expected) is int and str(compiled) != str(reference):
+            raise AssertionError(f"step {i}: '{compiled}' != '{reference}'")
+
+    # Jump to random points and check against a fresh reference run
+    reference = make()
+    done = 0
+    while done < steps:
+        n = rng.randint(0, max(1, steps // 20))
+        ahead = jumper.peek(n)
+        for _ in range(n):
+            reference.step()
+        done += n
+        if not same(jumper.advance(n), reference.value) or not same(
+            ahead, reference.value
+        ):
+            raise AssertionError(f"advance to {done}: {jumper.value!r}")
+
+
+def bench(automaton, steps):
+    start = time.perf_counter()
+    for _ in range(steps):
+        automaton.step()
+    return (time.perf_counter() - start) / steps * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--steps", type=int, default=1_000_000)
+    parser.add_argument("--random", type=int, default=200, help="random automata")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    verify(CountingAutomaton, args.steps, rng)
+    print(f"[bench] default automaton identical over {args.steps} steps")
+
+    reference = CountingAutomaton(DUPLICATE_STATES)
+    start = [reference.step() for _ in DUPLICATE_STATES_START]
+    if start != DUPLICATE_STATES_START:
+        raise AssertionError(f"duplicate states: {start} != {DUPLICATE_STATES_START}")
+    verify(lambda: CountingAutomaton(DUPLICATE_STATES), args.steps // 10, rng)
+    print("[bench] automaton with duplicate states follows its own transitions")
+
+    for operators, steps in ((("+", "-"), args.steps // 10), (("+", "-", "/"), 10_000)):
+        for _ in range(args.random):
+            seed = rng.random()
+            verify(lambda: random_automaton(random.Random(seed), operators), steps, rng)
+        print(
+            f"[bench] {args.random} random automata ({' '.join(operators)}) "
+            f"identical over {steps} steps"
+        )
+
+    # Multiplication grows big integers quickly, keep those runs short
+    for _ in range(args.random):
+        seed = rng.random()
+        verify(lambda: random_automaton(random.Random(seed), "+-*/"), 500, rng)
+    print(f"[bench] {args.random} random automata (+ - * /) identical over 500 steps")
+
+    reference = bench(CountingAutomaton(), args.steps)
+    compiled = bench(CountingAutomaton().compile(), args.steps)
+    print(
+        f"[bench] step: reference {reference:.1f} ns | compiled {compiled:.1f} ns "
+        f"({reference / compiled:.1f}x)"
+    )
+
+    automaton = CountingAutomaton().compile()
+    start = time.perf_counter()
+    automaton.advance(10**12)
+    print(f"[bench] advance(10**12): {(time.perf_counter() - start) * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
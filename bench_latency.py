@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Round-trip latency benchmark for the MIDI service input modes.
+Starts MidiService on its virtual ports, connects to them as a client and
+times each note from send to the transformed note coming back.
+
+    python bench_latency.py --mode all --count 1000
+"""
+
+import argparse
+import statistics
+import time
+import mido
+from midi_service import MidiService
+
+
+def find_port(names, prefix):
+    """Find a port by name prefix (backends may decorate virtual port names)"""
+    for name in names:
+        if name.startswith(prefix):
+            return name
+    raise RuntimeError(f"Port '{prefix}' not found in {names}")
+
+
+def run(mode, count, interval, idle):
+    """Benchmark one input mode, returns a dict of results"""
+    service = MidiService(input_mode=mode)
+    service.start()
+    if not service.running:
+        raise RuntimeError("MIDI service failed to start")
+
+    # Give the backend a moment to publish the virtual ports
+    time.sleep(0.2)
+    client_out = mido.open_output(find_port(mido.get_output_names(), service.IN_NAME))
+    client_in = mido.open_input(find_port(mido.get_input_names(), service.OUT_NAME))
+
+    try:
+        latencies = []
+        for i in range(count):
+            for msg_type in ("note_on", "note_off"):
+                msg = mido.Message(msg_type, note=60, velocity=100)
+                start = time.perf_counter()
+                client_out.send(msg)
+                client_in.receive()
+                latencies.append(time.perf_counter() - start)
+            time.sleep(interval)
+
+        # CPU used by the process while nothing is playing
+        cpu_start = time.process_time()
+        time.sleep(idle)
+        idle_cpu = (time.process_time() - cpu_start) / idle
+    finally:
+        client_out.close()
+        client_in.close()
+        service.stop()
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "messages": len(latencies),
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000,
+        "max_ms": latencies[-1] * 1000,
+        "idle_cpu_pct": idle_cpu * 100,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--mode", choices=MidiService.INPUT_MODES + ("all",), default="all"
+    )
+    parser.add_argument("--count", type=int, default=500, help="notes to send")
+    parser.add_argument(
+        "--interval", type=float, default=0.002, help="seconds between notes"
+    )
+    parser.add_argument(
+        "--idle", type=float, default=2.0, help="seconds to sample idle CPU"
+    )
+    args = parser.parse_args()
+
+    modes = MidiService.INPUT_MODES if args.mode == "all" else (args.mode,)
+    for mode in modes:
+        r = run(mode, args.count, args.interval, args.idle)
+        print(
+            f"[bench] {r['mode']:>8}: {r['messages']} msgs | "
+            f"p50 {r['p50_ms']:.3f} ms | p95 {r['p95_ms']:.3f} ms | "
+            f"max {r['max_ms']:.3f} ms | idle cpu {r['idle_cpu_pct']:.2f}%"
+        )
+
+
+if __name__ == "__main__":
+    main()
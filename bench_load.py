@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Synthetic load benchmark for MidiService.
+Runs the service on the in-memory loopback backend and drives it with load
+profiles, reporting throughput, ingress-to-send latency (from the service
+metrics) and process CPU per message. Use --json to save results and compare
+them across commits. With --ports the service gets that many inputs and
+outputs, each input routed to the next output, and the load is spread over
+the inputs round robin, to measure routing overhead against --ports 1.
+With --note-delay, notes go through the output scheduler and its dispatch
+jitter is reported. --max-jitter exits non-zero when its p99 is over budget.
+
+    python bench_load.py --profile all --messages 100000 --json results.json
+    python bench_load.py --profile chords --ports 32
+    python bench_load.py --profile mpe --rate 20000 --thin 5
+    python bench_load.py --profile single --rate 400 --note-delay 30 --max-jitter 1000
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import mido
+from loopback_backend import LoopbackBackend
+from midi_service import MidiService
+from routing import RoutingTable
+from thinning import TYPES
+
+
+def single_note(count):
+    """One note repeated on one channel"""
+    for i in range(count // 2):
+        yield mido.Message("note_on", note=60, velocity=100)
+        yield mido.Message("note_off", note=60, velocity=0)
+
+
+def chords(count):
+    """Dense 4-note chords on all 16 channels, released together"""
+    notes = (48, 52, 55, 59)
+    sent = 0
+    while sent < count:
+        for msg_type in ("note_on", "note_off"):
+            for channel in range(16):
+                for note in notes:
+                    yield mido.Message(
+                        msg_type, channel=channel, note=note, velocity=90
+                    )
+        sent += 16 * len(notes) * 2
+
+
+def storm(count):
+    """Overlapping note-on/off storm across channels and the keyboard"""
+    for i in range(count // 2):
+        channel = i % 16
+        note = (i * 37) % 128
+        yield mido.Message("note_on", channel=channel, note=note, velocity=1 + i % 127)
+        yield mido.Message("note_on", channel=channel, note=note, velocity=0)
+
+
+def flood(count):
+    """MIDI clock interleaved with CC sweeps"""
+    for i in range(count // 2):
+        yield mido.Message("clock")
+        yield mido.Message(
+            "control_change", channel=i % 16, control=1 + i % 8, value=i % 128
+        )
+
+
+def mpe(count):
+    """MPE-style expression: notes on their own channels under dense bend, pressure and CC74"""
+    sent = 0
+    i = 0
+    while sent < count:
+        channel = 1 + i % 15
+        note = 48 + i % 24
+        yield mido.Message("note_on", channel=channel, note=note, velocity=90)
+        for step in range(30):
+            yield mido.Message("pitchwheel", channel=channel, pitch=step * 273 - 4096)
+            yield mido.Message("aftertouch", channel=channel, value=step * 4)
+            yield mido.Message(
+                "control_change", channel=channel, control=74, value=64 + step
+            )
+        yield mido.Message("note_off", channel=channel, note=note, velocity=0)
+        sent += 92
+        i += 1
+
+
+PROFILES = {
+    "single": single_note,
+    "chords": chords,
+    "storm": storm,
+    "flood": flood,
+    "mpe": mpe,
+}
+
+
+def port_routing(ports):
+    """ports inputs and outputs, input i routed to output i + 1"""
+    inputs = [f"Bench In {i}" for i in range(ports)]
+    outputs = [f"Bench Out {i}" for i in range(ports)]
+    routes = [
+        {"input": name, "output": outputs[(i + 1) % ports]}
+        for i, name in enumerate(inputs)
+    ]
+    return RoutingTable(inputs, outputs, routes)
+
+
+def run(profile, count, rate, input_mode, ports=1, thin=0.0, note_delay=0.0):
+    """Drive one profile through a fresh service and collect results"""
+    backend = LoopbackBackend()
+    routing = port_routing(ports) if ports > 1 else None
+    thinning = dict.fromkeys(TYPES, thin) if thin else None
+    service = MidiService(
+        input_mode=input_mode,
+        port_backend=backend,
+        routing=routing,
+        thinning=thinning,
+        note_delay=note_delay,
+    )
+    service.start()
+
+    received = []
+    clients_in = [
+        backend.open_input(name, callback=received.append)
+        for name in service.routing.outputs
+    ]
+    clients_out = [backend.open_output(name) for name in service.routing.inputs]
+    messages = list(PROFILES[profile](count))[:count]
+    interval = 1.0 / rate if rate else 0.0
+
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    for i, msg in enumerate(messages):
+        if interval:
+            # Pace the load with sleeps, so the client does not inflate CPU
+            delay = start + i * interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        clients_out[i % ports].send(msg)
+
+    # Wait until the service has handled every message
+    while service.metrics.total_messages() < len(messages):
+        time.sleep(0.0005)
+    # and every delayed note is out
+    while service.scheduler.pending():
+        time.sleep(0.0005)
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+
+    report = service.get_metrics()
+    service.stop()
+    for client_in in clients_in:
+        client_in.close()
+
+    return {
+        "profile": profile,
+        "input_mode": input_mode,
+        "ports": ports,
+        "messages": len(messages),
+        "received": len(received),
+        "rate": rate,
+        "throughput": len(messages) / elapsed,
+        "cpu_us_per_message": cpu / len(messages) * 1e6,
+        "latency_us": service.metrics.merged("sent").summary(),
+        "channels": report["channels"],
+        "thinning": report.get("thinning"),
+        "scheduler": report["scheduler"] if note_delay else None,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True
+        ).stdout.strip()
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--profile", choices=tuple(PROFILES) + ("all",), default="all")
+    parser.add_argument("--messages", type=int, default=50_000)
+    parser.add_argument(
+        "--rate", type=float, default=0, help="messages/s, 0 for as fast as possible"
+    )
+    parser.add_argument("--mode", choices=MidiService.INPUT_MODES, default="callback")
+    parser.add_argument(
+        "--ports", type=int, default=1, help="input and output ports, routed"
+    )
+    parser.add_argument(
+        "--thin", type=float, default=0, help="controller thinning window in ms"
+    )
+    parser.add_argument(
+        "--note-delay", type=float, default=0, help="delay output notes by ms"
+    )
+    parser.add_argument(
+        "--max-jitter",
+        type=float,
+        help="fail when scheduler jitter p99 is over this many us",
+    )
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    profiles = tuple(PROFILES) if args.profile == "all" else (args.profile,)
+    results = []
+    for profile in profiles:
+        r = run(
+            profile,
+            args.messages,
+            args.rate,
+            args.mode,
+            args.ports,
+            args.thin / 1000,
+            args.note_delay / 1000,
+        )
+        results.append(r)
+        latency = r["latency_us"]
+        print(
+            f"[bench] {profile:>6}: {r['throughput']:>9.0f} msg/s | "
+            f"cpu {r['cpu_us_per_message']:.1f} us/msg | latency p50 {latency['p50']:.1f} "
+            f"p95 {latency['p95']:.1f} p99 {latency['p99']:.1f} max {latency['max']:.1f} us | "
+            f"{r['ports']} ports"
+        )
+        thinning = r["thinning"]
+        if thinning:
+            print(
+                f"[bench] {profile:>6}: {r['received']} sent | thinning dropped "
+                f"{thinning['dropped']} coalesced {thinning['coalesced']} "
+                f"flushed {thinning['flushed']}"
+            )
+        scheduler = r["scheduler"]
+        if scheduler:
+            jitter = scheduler["jitter_us"]
+            print(
+                f"[bench] {profile:>6}: {scheduler['dispatched']} scheduled | jitter "
+                f"p50 {jitter['p50']:.1f} p95 {jitter['p95']:.1f} "
+                f"p99 {jitter['p99']:.1f} max {jitter['max']:.1f} us"
+            )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(
+                {
+                    "commit": git_commit(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+        print(f"[bench] Results written to {args.json}")
+
+    if args.max_jitter is not None:
+        over = [
+            r["profile"]
+            for r in results
+            if r["scheduler"] and r["scheduler"]["jitter_us"]["p99"] > args.max_jitter
+        ]
+        if over:
+            print(
+                f"[bench] Jitter p99 over {args.max_jitter:.0f} us: {', '.join(over)}"
+            )
+            sys.exit(1)
+        print(f"[bench] Jitter p99 within {args.max_jitter:.0f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Markup rendering microbenchmark.
+Compares the previous search-and-replace renderer with the single-pass
+render_markup() and the precompiled template fill, after checking that all
+three produce byte-identical HTML for every display format. Also compares
+the UI transfer per frame (bytes and Python cost): lines rendered with
+inline styles, lines rendered with theme classes, and structured JSON events
+formatted by the page.
+
+    python bench_markup.py --events 20000
+"""
+
+import argparse
+import json
+import re
+import time
+from harmonic_processor import HarmonicProcessor
+from presentation_service import DisplayData, PresentationService
+from theme_compiler import class_name
+from themes.ayu.dark import syntax
+
+
+def class_span(tag):
+    return f'<span class="{class_name(tag)}">'
+
+
+def inline_span(tag):
+    """Spans before the theme compiler: the full style inlined in every span"""
+    return f'<span style="{syntax.get(tag, "")}">'
+
+
+def legacy_render_markup(text, span=class_span):
+    """Previous renderer: repeated re.search plus str.replace over the line"""
+    while True:
+        match = re.search(r"<(\w+)>(.*?)</\1>", text)
+        if not match:
+            break
+        replacement = f"{span(match.group(1))}{match.group(2)}</span>"
+        text = text.replace(match.group(0), replacement)
+    return text
+
+
+def sample_data(count):
+    """Display data for note-on/off events, processor and automaton formats"""
+    presentation = PresentationService()
+    processors = [HarmonicProcessor(n_harmonics=n) for n in (3, 8, 12)]
+    data = []
+    for i in range(count):
+        processor = processors[i % len(processors)]
+        note = 36 + i % 48
+        output_note = processor.process(note)
+        data.append(presentation.format_midi_event(None, note, output_note, processor))
+        data.append(
+            presentation.format_midi_event(
+                None, note, output_note, processor, is_off=True
+            )
+        )
+        data.append(presentation.format_harmonic_processor(processor))
+        data.append(presentation.format_automaton(processor.automaton))
+    return data
+
+
+def verify(presentation, data):
+    demo = [
+        "This is <note>C#4</note>",
+        "Oops: <error>bad timing</error>",
+        "<fg><tag>1</tag><tag>1</tag> <markup>[</markup></fg>",
+        "unpaired <tag>tag and </markup> close",
+    ]
+    for text in demo + [d.content for d in data]:
+        expected = legacy_render_markup(text)
+        if presentation.render_markup(text) != expected:
+            raise AssertionError(f"render_markup differs for {text!r}")
+    for d in data:
+        if presentation.render(d) != legacy_render_markup(d.content):
+            raise AssertionError(f"template fill differs for {d.content!r}")
+        # Lazily formatted snapshots render the same line
+        lazy = DisplayData(snapshot=d.snapshot)
+        if d.snapshot and presentation.render(lazy) != legacy_render_markup(d.content):
+            raise AssertionError(f"snapshot differs for {d.content!r}")
+
+
+def bench(render, items):
+    start = time.perf_counter()
+    for item in items:
+        render(item)
+    return (time.perf_counter() - start) / len(items) * 1e6
+
+
+def inline_frame(presentation, frame):
+    """Lines rendered in Python with inline styles, inlined into the script"""
+    # Formatted on copies, the same snapshots are encoded afterwards
+    contents = [
+        presentation.format_snapshot(DisplayData(snapshot=d.snapshot)).content
+        for d in frame
+    ]
+    lines = "".join(
+        f'<div class="line">{legacy_render_markup(content, inline_span)}</div>'
+        for content in contents
+    )
+    return f"appendLines('pane_0', '{lines}');"
+
+
+def html_frame(presentation, frame):
+    """Lines rendered in Python with theme classes, inlined into the script"""
+    lines = "".join(f'<div class="line">{presentation.render(d)}</div>' for d in frame)
+    return f"appendLines('pane_0', '{lines}');"
+
+
+def events_frame(presentation, frame):
+    """Structured events, formatted by index.html"""
+    events = {"pane_0": [presentation.encode(d) for d in frame]}
+    return f"appendEvents({json.dumps(events, separators=(',', ':'))});"
+
+
+def bench_transfer(presentation, data, frame_size=64):
+    """Script bytes and Python cost per event of each UI transfer"""
+    frames = [data[i : i + frame_size] for i in range(0, len(data), frame_size)]
+    results = {}
+    for name, encode in (
+        ("inline", inline_frame),
+        ("html", html_frame),
+        ("events", events_frame),
+    ):
+        start = time.perf_counter()
+        size = sum(len(encode(presentation, frame).encode()) for frame in frames)
+        elapsed = time.perf_counter() - start
+        results[name] = (size / len(data), elapsed / len(data) * 1e6)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=20000)
+    args = parser.parse_args()
+
+    presentation = PresentationService()
+    data = sample_data(args.events)
+    verify(presentation, data)
+    print(f"[bench] {len(data)} lines byte-identical across renderers")
+
+    lines = [d.content for d in data]
+    legacy = bench(legacy_render_markup, lines)
+    single_pass = bench(presentation.render_markup, lines)
+    template = bench(presentation.render, data)
+    print(f"[bench] legacy      {legacy:.2f} us/line")
+    print(
+        f"[bench] single-pass {single_pass:.2f} us/line ({legacy / single_pass:.1f}x)"
+    )
+    print(f"[bench] template    {template:.2f} us/line ({legacy / template:.1f}x)")
+
+    # Per-note cost on the MIDI thread: eager formatting against a snapshot
+    processor = HarmonicProcessor(n_harmonics=8)
+    notes = [processor.process(60) for _ in range(args.events)]
+    eager = bench(
+        lambda n: presentation.format_midi_event(None, 60, n, processor), notes
+    )
+    lazy = bench(lambda n: presentation.snapshot_midi_event(60, n, processor), notes)
+    print(
+        f"[bench] midi thread: format {eager:.2f} us/note | snapshot {lazy:.2f} us/note"
+    )
+
+    # What the UI thread sends to the page, for the note events it actually queues
+    snapshots = []
+    for i, n in enumerate(notes):
+        snapshots.append(
+            presentation.snapshot_midi_event(60, n, processor, is_off=i % 2 == 1)
+        )
+    transfer = bench_transfer(presentation, snapshots)
+    for name, (size, cost) in transfer.items():
+        print(
+            f"[bench] ui transfer {name:>6}: {size:.0f} bytes/event | {cost:.2f} us/event"
+        )
+
+
+if __name__ == "__main__":
+    main()
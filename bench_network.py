@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Network MIDI benchmark over localhost.
+Runs MidiService on a UDP network backend and drives it from a second
+backend, as another machine on the stage network would. Client datagrams go
+through a relay that can drop, reorder and duplicate them, to exercise loss
+and reordering handling. Reports per-peer packet rates, loss counters and
+latency from both ends, and round-trip note latency.
+
+    python bench_network.py --count 2000 --rate 500
+    python bench_network.py --loss 0.02 --reorder 0.05 --duplicate 0.01
+"""
+
+import argparse
+import random
+import socket
+import threading
+import time
+import mido
+from metrics import Histogram
+from midi_service import MidiService
+from network_backend import NetworkBackend
+
+
+class Relay:
+    """UDP relay from one address to another that impairs the datagrams it forwards"""
+
+    def __init__(self, target, loss=0.0, reorder=0.0, duplicate=0.0, seed=1):
+        self.target = target
+        self.loss = loss
+        self.reorder = reorder
+        self.duplicate = duplicate
+        self.random = random.Random(seed)
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind(("127.0.0.1", 0))
+        self.socket.settimeout(0.1)
+        self.address = self.socket.getsockname()
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.thread.join()
+        self.socket.close()
+
+    def _run(self):
+        held = None
+        while self.running:
+            try:
+                data, _ = self.socket.recvfrom(65536)
+            except socket.timeout:
+                continue
+            r = self.random.random()
+            if r < self.loss:
+                continue
+            if held is None and r < self.loss + self.reorder:
+                # Swap with the next datagram
+                held = data
+                continue
+            self.socket.sendto(data, self.target)
+            if r > 1 - self.duplicate:
+                self.socket.sendto(data, self.target)
+            if held is not None:
+                self.socket.sendto(held, self.target)
+                held = None
+
+
+def print_peers(side, stats):
+    for peer, s in stats["peers"].items():
+        latency = s["latency_us"]
+        print(
+            f"[bench] {side} peer {peer}: in {s['packets_in']} packets "
+            f"({s['packets_in_per_s']:.0f}/s, {s['events_in']} events) | "
+            f"out {s['packets_out']} ({s['packets_out_per_s']:.0f}/s, {s['events_out']} events)"
+        )
+        print(
+            f"[bench] {side} peer {peer}: out of order {s['out_of_order']} lost {s['lost']} "
+            f"late {s['late']} duplicate {s['duplicate']} skewed {s['skewed']} | latency p50 {latency['p50']:.1f} "
+            f"p99 {latency['p99']:.1f} max {latency['max']:.1f} us"
+        )
+
+
+def run(args):
+    server = NetworkBackend(bind=("127.0.0.1", 0), reorder_window=args.window / 1000)
+    service = MidiService(port_backend=server, input_mode=args.mode)
+    service.start()
+
+    relay = Relay(server.address, args.loss, args.reorder, args.duplicate)
+    relay.start()
+    client = NetworkBackend(
+        bind=("127.0.0.1", 0), peers=[relay.address], reorder_window=args.window / 1000
+    )
+    client.start()
+    # The service answers the client directly
+    server.peers.append(client.address)
+
+    # Round trip from the client's send to the transformed note coming back
+    sent_at = {}
+    round_trip = Histogram()
+    returned = []
+
+    def on_note(msg):
+        if msg.type == "note_on" and msg.velocity:
+            start = sent_at.pop(msg.velocity, None)
+            if start is not None:
+                round_trip.record(time.perf_counter_ns() - start)
+        returned.append(msg)
+
+    client_in = client.open_input(service.OUT_NAME, callback=on_note)
+    client_out = client.open_output(service.IN_NAME)
+
+    interval = 1.0 / args.rate
+    start = time.perf_counter()
+    for i in range(args.count):
+        delay = start + i * interval - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        # Velocity tags the note to match it on the way back
+        velocity = 1 + i % 127
+        channel = i % 16
+        chord = (48, 52, 55)[: args.chord]
+        sent_at[velocity] = time.perf_counter_ns()
+        for note in chord:
+            client_out.send(
+                mido.Message("note_on", channel=channel, note=note, velocity=velocity)
+            )
+        for note in chord:
+            client_out.send(mido.Message("note_off", channel=channel, note=note))
+    time.sleep(0.2)
+
+    print_peers("client", client.get_stats())
+    print_peers("service", server.get_stats())
+    latency = round_trip.summary()
+    print(
+        f"[bench] round trip: {latency['count']} notes | p50 {latency['p50']:.1f} "
+        f"p95 {latency['p95']:.1f} p99 {latency['p99']:.1f} max {latency['max']:.1f} us | "
+        f"{len(returned)} messages back, {service.active_notes.voices} left sounding"
+    )
+
+    service.stop()
+    client_in.close()
+    client.close()
+    server.close()
+    relay.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=2000, help="chords to send")
+    parser.add_argument("--rate", type=float, default=500, help="chords/s")
+    parser.add_argument("--chord", type=int, default=3, help="notes per chord (1-3)")
+    parser.add_argument("--mode", choices=MidiService.INPUT_MODES, default="callback")
+    parser.add_argument("--loss", type=float, default=0.0, help="drop probability")
+    parser.add_argument("--reorder", type=float, default=0.0, help="swap probability")
+    parser.add_argument(
+        "--duplicate", type=float, default=0.0, help="duplicate probability"
+    )
+    parser.add_argument(
+        "--window", type=float, default=5.0, help="reorder window in ms"
+    )
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
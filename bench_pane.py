@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Pane write latency benchmark.
+Opens index.html in a webview and appends rendered MIDI event lines to a
+pane, timing each write in the page. "events" renders structured events
+with appendEvents(), "nodes" appends pre-rendered lines with appendLines(),
+"inline" does the same with the inline-styled spans used before theme
+classes and "innerhtml" is the original innerHTML += approach. After the run
+the page's JS heap (Chromium only) and node count are reported, raise
+--scrollback to compare DOM memory over a long history.
+
+    python bench_pane.py --mode events --lines 1000000
+    python bench_pane.py --mode inline --lines 100000 --scrollback 100000
+    python bench_pane.py --mode innerhtml --lines 20000 --chunk 1000
+"""
+
+import argparse
+import json
+import webview
+from harmonic_processor import HarmonicProcessor
+from presentation_service import DisplayData, PresentationService
+from bench_markup import inline_span, legacy_render_markup
+
+BENCH_JS = """
+(function () {
+    var pane = document.createElement("div");
+    pane.id = "bench_pane";
+    pane.className = "pane";
+    document.getElementById("pane-container").appendChild(pane);
+    var line = %(line)s;
+    var inline = %(inline)s;
+    var events = {bench_pane: [%(event)s]};
+    setTheme(%(theme)s);
+    setScrollback(%(scrollback)d);
+    var results = [];
+    for (var done = 0; done < %(lines)d; done += %(chunk)d) {
+        var start = performance.now();
+        for (var i = 0; i < %(chunk)d; i++) {
+            %(write)s
+        }
+        results.push((performance.now() - start) / %(chunk)d);
+    }
+    return {
+        results: results,
+        heap: performance.memory ? performance.memory.usedJSHeapSize : null,
+        nodes: document.getElementsByTagName("*").length,
+    };
+})()
+"""
+
+WRITES = {
+    "events": "appendEvents(events);",
+    "nodes": "appendLines('bench_pane', '<div class=\"line\">' + line + '</div>');",
+    "inline": "appendLines('bench_pane', '<div class=\"line\">' + inline + '</div>');",
+    "innerhtml": "pane.innerHTML += line + '<br/>'; pane.scrollTop = pane.scrollHeight;",
+}
+
+
+def sample_line():
+    """A realistic note-on line: rendered, rendered with inline styles and as an event"""
+    presentation = PresentationService()
+    processor = HarmonicProcessor(n_harmonics=8)
+    output_note = processor.process(60)
+    display_data = presentation.snapshot_midi_event(60, output_note, processor)
+    content = presentation.format_snapshot(DisplayData(snapshot=display_data.snapshot))
+    return (
+        presentation.render(display_data),
+        legacy_render_markup(content.content, inline_span),
+        presentation.encode(display_data),
+    )
+
+
+def run(window, args):
+    window.events.loaded.wait()
+    line, inline, event = sample_line()
+    script = BENCH_JS % {
+        "line": json.dumps(line),
+        "inline": json.dumps(inline),
+        "event": json.dumps(event),
+        "theme": json.dumps(PresentationService().theme_css()),
+        "scrollback": args.scrollback,
+        "lines": args.lines,
+        "chunk": args.chunk,
+        "write": WRITES[args.mode],
+    }
+    report = window.evaluate_js(script)
+    for i, ms in enumerate(report["results"]):
+        print(
+            f"[bench] {args.mode}: lines {(i + 1) * args.chunk:>8} | {ms * 1000:.1f} us/write"
+        )
+    heap = report["heap"]
+    heap = f"{heap / 1e6:.1f} MB" if heap else "unavailable"
+    print(f"[bench] {args.mode}: {report['nodes']} nodes | JS heap {heap}")
+    window.destroy()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mode", choices=tuple(WRITES), default="events")
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    parser.add_argument("--chunk", type=int, default=50_000, help="lines per sample")
+    parser.add_argument("--scrollback", type=int, default=2000, help="lines kept")
+    args = parser.parse_args()
+
+    window = webview.create_window(
+        "wanderer bench", "index.html", width=800, height=600
+    )
+    webview.start(run, (window, args))
+
+
+if __name__ == "__main__":
+    main()
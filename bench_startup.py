@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark.
+Measures module import times in fresh interpreters (python -X importtime) and
+time-to-first-note of the headless engine: from spawning
+`main.py --headless --no-watch` until a note sent to its virtual input comes
+back transformed on its output.
+
+    python bench_startup.py --runs 5
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+MODULES = ("main", "midi_service", "ui_service", "file_watcher_service", "webview")
+
+
+def import_time(module):
+    """Cumulative import time of a module in ms, None if it fails to import"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        return None
+    for line in result.stderr.splitlines():
+        parts = [part.strip() for part in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1]) / 1000
+    return None
+
+
+def time_to_first_note(timeout=20.0):
+    """Seconds from spawning the headless engine to its first transformed note"""
+    import mido
+
+    start = time.perf_counter()
+    engine = subprocess.Popen(
+        [sys.executable, "main.py", "--headless", "--no-watch", "--log", os.devnull],
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        # Wait for the engine's virtual ports to appear
+        while True:
+            if time.perf_counter() - start > timeout:
+                raise RuntimeError("engine ports did not appear")
+            outputs = [n for n in mido.get_output_names() if n.startswith("PY MIDI In")]
+            inputs = [n for n in mido.get_input_names() if n.startswith("PY MIDI Out")]
+            if outputs and inputs:
+                break
+            time.sleep(0.005)
+        ports_ready = time.perf_counter() - start
+
+        with mido.open_input(inputs[0]) as client_in, mido.open_output(
+            outputs[0]
+        ) as client_out:
+            client_out.send(mido.Message("note_on", note=60, velocity=100))
+            client_in.receive()
+            first_note = time.perf_counter() - start
+            client_out.send(mido.Message("note_off", note=60, velocity=0))
+    finally:
+        engine.terminate()
+        engine.wait()
+    return ports_ready, first_note
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--imports-only", action="store_true", help="skip time-to-first-note"
+    )
+    args = parser.parse_args()
+
+    for module in MODULES:
+        times = [import_time(module) for _ in range(args.runs)]
+        if None in times:
+            print(f"[bench] import {module:>20}: unavailable")
+        else:
+            print(f"[bench] import {module:>20}: {statistics.median(times):.1f} ms")
+
+    if args.imports_only:
+        return
+
+    runs = [time_to_first_note() for _ in range(args.runs)]
+    ports_ready = statistics.median(r[0] for r in runs) * 1000
+    first_note = statistics.median(r[1] for r in runs) * 1000
+    print(f"[bench] headless ports ready: {ports_ready:.1f} ms")
+    print(f"[bench] headless first note:  {first_note:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
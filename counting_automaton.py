@@ -1,4 +1,6 @@
+from array import array
 from dataclasses import dataclass
+import json
 import operator
 
 
@@ -13,12 +15,34 @@ class State:
         return hash((self.counter, self.threshold, self.operator, self.operand))
 
 
+# Automaton description: states and, by index, the state each one moves on to
+# (each to the next, wrapping around, when "transitions" is left out). Optional
+# "initial" state index and starting "value".
+DEFAULT_CONFIG = {
+    "states": [
+        {"threshold": 1, "operator": "+", "operand": 1},
+        {"threshold": 2, "operator": "-", "operand": 1},
+        {"threshold": 1, "operator": "+", "operand": 5},
+        {"threshold": 1, "operator": "-", "operand": 2},
+    ],
+    "transitions": [1, 2, 3, 0],
+}
+
+
+def load_config(path):
+    """Automaton description from a JSON file"""
+    with open(path) as f:
+        return json.load(f)
+
+
 class CountingAutomaton:
     """
-    State machine that applies an operator and operand to a value at each step, and transitions to a new state when the current state's counter reaches a threshold.
+    State machine that applies an operator and operand to a value at each step, and transitions to a new state when the current state's counter reaches a threshold. Built from a description (see DEFAULT_CONFIG), the default one when None.
     """
 
-    def __init__(self):
+    def __init__(self, config=None):
+        if config is None:
+            config = DEFAULT_CONFIG
         self.ops = {
             "+": operator.add,
             "-": operator.sub,
@@ -27,54 +51,264 @@ class CountingAutomaton:
         }
         self.states = [
             State(
-                counter=0,
-                threshold=1,
-                operator="+",
-                operand=1,
-            ),
-            State(
-                counter=0,
-                threshold=2,
-                operator="-",
-                operand=1,
-            ),
-            State(
-                counter=0,
-                threshold=1,
-                operator="+",
-                operand=5,
-            ),
-            State(
-                counter=0,
-                threshold=1,
-                operator="-",
-                operand=2,
-            ),
+                counter=state.get("counter", 0),
+                threshold=state["threshold"],
+                operator=state["operator"],
+                operand=state["operand"],
+            )
+            for state in config["states"]
         ]
-        self.current_state = self.states[0]
-        self.transition_matrix = {
-            self.states[0]: self.states[1],
-            self.states[1]: self.states[2],
-            self.states[2]: self.states[3],
-            self.states[3]: self.states[0],
-        }
-        self.value = 0
+        count = len(self.states)
+        transitions = config.get("transitions")
+        if transitions is None:
+            transitions = [(i + 1) % count for i in range(count)]
+        initial = config.get("initial", 0)
+        if not count:
+            raise ValueError("Automaton needs at least one state")
+        for state in self.states:
+            if state.operator not in self.ops:
+                raise ValueError(f"Unknown operator: {state.operator}")
+            if state.threshold < 1:
+                raise ValueError(f"Threshold must be at least 1: {state.threshold}")
+        if len(transitions) != count or not all(
+            0 <= t < count for t in list(transitions) + [initial]
+        ):
+            raise ValueError("Transitions and initial state must be state indices")
+
+        # By state index, so states with equal fields keep their own transitions
+        self.transitions = list(transitions)
+        self.current = initial
+        self.value = config.get("value", 0)
+
+    @classmethod
+    def load(cls, path):
+        return cls(load_config(path))
+
+    @property
+    def current_state(self):
+        return self.states[self.current]
 
     def apply_op(self, op):
         return self.ops[op](self.value, self.current_state.operand)
 
     def step(self):
-        self.current_state.counter += 1
-        if self.current_state.counter >= self.current_state.threshold:
-            self.current_state.counter = 0
-            self.current_state = self.transition_matrix[self.current_state]
+        state = self.states[self.current]
+        state.counter += 1
+        if state.counter >= state.threshold:
+            state.counter = 0
+            self.current = self.transitions[self.current]
         self.value = self.apply_op(self.current_state.operator)
         return self.value
 
+    def compile(self):
+        """Return a CompiledAutomaton that continues from the current position"""
+        return CompiledAutomaton(self)
+
     def __str__(self):
         return f"{self.current_state.counter:02d} | {self.current_state.operator} {self.current_state.operand:02d} | {self.value:02d}"
 
 
+class CompiledAutomaton:
+    """
+    Flat, integer-indexed form of a CountingAutomaton. The automaton is deterministic, so its (state, counter) sequence is eventually periodic: it is unrolled once into integer tables covering the tail and one cycle. When every reachable operator is + or - on integers, a full cycle adds a constant to the value and step(), advance(n) and peek(k) are O(1). Otherwise the operators are applied step by step in the same order, which keeps float results (the / operator) bit-identical.
+    """
+
+    __slots__ = (
+        "thresholds",
+        "operators",
+        "operands",
+        "funcs",
+        "state_table",
+        "counter_table",
+        "offset_table",
+        "tail",
+        "period",
+        "cycle_delta",
+        "additive",
+        "position",
+        "base",
+        "value",
+        "steps",
+    )
+
+    def __init__(self, automaton):
+        states = automaton.states
+        self.thresholds = tuple(state.threshold for state in states)
+        self.operators = tuple(state.operator for state in states)
+        self.operands = tuple(state.operand for state in states)
+        self.funcs = tuple(automaton.ops[state.operator] for state in states)
+
+        transitions = automaton.transitions
+
+        # Unroll until a full configuration (current state and every counter) repeats
+        current = automaton.current
+        counters = [state.counter for state in states]
+        additive = type(automaton.value) is int
+        offset = 0
+        state_table = [current]
+        counter_table = [counters[current]]
+        offsets = [offset]
+        seen = {(current, tuple(counters)): 0}
+        while True:
+            counters[current] += 1
+            if counters[current] >= self.thresholds[current]:
+                counters[current] = 0
+                current = transitions[current]
+            additive = (
+                additive
+                and self.operators[current] in ("+", "-")
+                and type(self.operands[current]) is int
+            )
+            if additive:
+                offset = self.funcs[current](offset, self.operands[current])
+
+            key = (current, tuple(counters))
+            if key in seen:
+                break
+            seen[key] = len(state_table)
+            state_table.append(current)
+            counter_table.append(counters[current])
+            offsets.append(offset)
+
+        self.tail = seen[key]
+        self.period = len(state_table) - self.tail
+        self.state_table = array("q", state_table)
+        self.counter_table = array("q", counter_table)
+        self.offset_table = None
+        self.cycle_delta = 0
+        if additive:
+            try:
+                self.offset_table = array("q", offsets)
+                self.cycle_delta = offset - offsets[self.tail]
+            except OverflowError:
+                additive = False
+        self.additive = additive
+
+        self.position = 0
+        self.base = automaton.value
+        self.value = automaton.value
+        # Steps taken since compiling, lets a rebuilt automaton resume at the same point
+        self.steps = 0
+
+    @property
+    def counter(self):
+        return self.counter_table[self.position]
+
+    @property
+    def operator(self):
+        return self.operators[self.state_table[self.position]]
+
+    @property
+    def operand(self):
+        return self.operands[self.state_table[self.position]]
+
+    @property
+    def current_state(self):
+        """Current state as a State, built on demand for display"""
+        i = self.state_table[self.position]
+        return State(
+            counter=self.counter_table[self.position],
+            threshold=self.thresholds[i],
+            operator=self.operators[i],
+            operand=self.operands[i],
+        )
+
+    def _locate(self, position, base, n):
+        """Table position and cycle base n steps after (position, base)"""
+        position += n
+        end = self.tail + self.period
+        if position >= end:
+            cycles, position = divmod(position - self.tail, self.period)
+            position += self.tail
+            base += cycles * self.cycle_delta
+        return position, base
+
+    def step(self):
+        self.steps += 1
+        position = self.position + 1
+        if position == self.tail + self.period:
+            position = self.tail
+            self.base += self.cycle_delta
+        self.position = position
+        if self.additive:
+            self.value = self.base + self.offset_table[position]
+        else:
+            i = self.state_table[position]
+            self.value = self.funcs[i](self.value, self.operands[i])
+        return self.value
+
+    def advance(self, n):
+        """Advance n steps and return the value, O(1) for additive automata"""
+        if n < 0:
+            raise ValueError("Cannot advance a negative number of steps")
+        if not self.additive:
+            for _ in range(n):
+                self.step()
+            return self.value
+        self.position, self.base = self._locate(self.position, self.base, n)
+        self.value = self.base + self.offset_table[self.position]
+        self.steps += n
+        return self.value
+
+    def peek(self, k):
+        """Value k steps ahead without advancing, O(1) for additive automata"""
+        if k < 0:
+            raise ValueError("Cannot peek a negative number of steps")
+        if not self.additive:
+            position, value = self.position, self.value
+            for _ in range(k):
+                position += 1
+                if position == self.tail + self.period:
+                    position = self.tail
+                i = self.state_table[position]
+                value = self.funcs[i](value, self.operands[i])
+            return value
+        position, base = self._locate(self.position, self.base, k)
+        return base + self.offset_table[position]
+
+    def take(self, n):
+        """Advance n steps and return the list of values produced"""
+        if not self.additive:
+            return [self.step() for _ in range(n)]
+        position, base = self.position, self.base
+        tail, end = self.tail, self.tail + self.period
+        offsets = self.offset_table
+        values = []
+        for _ in range(n):
+            position += 1
+            if position == end:
+                position = tail
+                base += self.cycle_delta
+            values.append(base + offsets[position])
+        self.position, self.base = position, base
+        self.steps += n
+        if values:
+            self.value = values[-1]
+        return values
+
+    def take_array(self, n):
+        """Like take(), but vectorized into a NumPy array (requires numpy)"""
+        import numpy
+
+        if not self.additive:
+            return numpy.array(self.take(n))
+        steps = numpy.arange(
+            self.position + 1, self.position + n + 1, dtype=numpy.int64
+        )
+        cycles, positions = numpy.divmod(steps - self.tail, self.period)
+        in_tail = steps < self.tail
+        positions = numpy.where(in_tail, steps, positions + self.tail)
+        cycles = numpy.where(in_tail, 0, cycles)
+        offsets = numpy.frombuffer(self.offset_table, dtype=numpy.int64)
+        values = self.base + offsets[positions] + cycles * self.cycle_delta
+        self.advance(n)
+        return values
+
+    def __str__(self):
+        i = self.state_table[self.position]
+        return f"{self.counter:02d} | {self.operators[i]} {self.operands[i]:02d} | {self.value:02d}"
+
+
 if __name__ == "__main__":
     sm = CountingAutomaton()
     for _ in range(120):
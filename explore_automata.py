@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Offline explorer for counting automaton configurations.
+Sweeps automaton descriptions (random samples or a grid of thresholds,
+operators and operands) across a process pool. Each is run through a
+HarmonicProcessor with vectorized sequence generation, measuring its period,
+harmonic-index distribution and note range. Results go to a CSV table to sort
+and filter, and into a cache keyed by a hash of the configuration and
+analysis settings, so repeated sweeps skip known results.
+
+    python explore_automata.py --count 5000 --out sweep.csv
+    python explore_automata.py --grid --states 3 --operands 1-4 --sort -entropy
+    python explore_automata.py --operators "+-*" --where "distinct>=6" --where "period<=16"
+"""
+
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import math
+import operator
+import os
+import random
+import re
+from concurrent.futures import ProcessPoolExecutor
+from counting_automaton import DEFAULT_CONFIG
+from harmonic_processor import HarmonicProcessor
+
+COLUMNS = (
+    "hash",
+    "states",
+    "period",
+    "tail",
+    "cycle_delta",
+    "index_period",
+    "distinct",
+    "entropy",
+    "note_min",
+    "note_max",
+    "distribution",
+    "status",
+    "config",
+)
+
+# Part of the cache key, bumped when analysis results change for the same input
+# (2: states with equal fields follow their own transitions)
+ANALYSIS_VERSION = 2
+
+COMPARISONS = {
+    ">=": operator.ge,
+    "<=": operator.le,
+    "!=": operator.ne,
+    "==": operator.eq,
+    ">": operator.gt,
+    "<": operator.lt,
+}
+
+
+def config_hash(config, settings):
+    """Stable key of a description and the analysis settings it was run with"""
+    text = json.dumps([config, settings], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+def analyze(config, steps=4096, n_harmonics=8, note=60):
+    """One table row for an automaton description"""
+    import numpy
+
+    row = dict.fromkeys(COLUMNS, "")
+    row["states"] = len(config["states"])
+    row["config"] = json.dumps(config, separators=(",", ":"))
+    try:
+        processor = HarmonicProcessor(n_harmonics, automaton=config)
+        automaton = processor.automaton
+        # inf and nan from / are reported below, not warned about per worker
+        with numpy.errstate(all="ignore"):
+            notes, indices = processor.process_batch(
+                numpy.full(steps, note, dtype=numpy.int64)
+            )
+        counts = numpy.bincount(indices, minlength=n_harmonics)
+    except Exception as e:
+        # Operators can make the sequence unusable, like / giving float indices
+        row["status"] = f"{type(e).__name__}: {e}"
+        return row
+
+    row["period"] = automaton.period
+    row["tail"] = automaton.tail
+    if automaton.additive:
+        row["cycle_delta"] = automaton.cycle_delta
+        # Each cycle shifts the index by cycle_delta, so the index sequence
+        # repeats after this many steps (or a divisor of it)
+        row["index_period"] = (
+            automaton.period
+            * n_harmonics
+            // math.gcd(automaton.cycle_delta, n_harmonics)
+        )
+    p = counts[counts > 0] / steps
+    row["distinct"] = len(p)
+    row["entropy"] = round(float(-(p * numpy.log2(p)).sum()), 4)
+    row["note_min"] = int(notes.min())
+    row["note_max"] = int(notes.max())
+    row["distribution"] = " ".join(f"{c / steps:.3f}" for c in counts)
+    row["status"] = "ok"
+    return row
+
+
+def parse_range(text):
+    """ "1-4,7" to [1, 2, 3, 4, 7]"""
+    values = []
+    for part in text.split(","):
+        low, _, high = part.partition("-")
+        values.extend(range(int(low), int(high or low) + 1))
+    return values
+
+
+def state_options(args):
+    return [
+        {"threshold": t, "operator": o, "operand": n}
+        for t in args.thresholds
+        for o in args.operators
+        for n in args.operands
+    ]
+
+
+def random_configs(args):
+    """Sampled descriptions, random transitions unless --cycle"""
+    rng = random.Random(args.seed)
+    options = state_options(args)
+    for _ in range(args.count):
+        count = rng.choice(args.states)
+        config = {"states": [rng.choice(options) for _ in range(count)]}
+        if not args.cycle:
+            config["transitions"] = [rng.randrange(count) for _ in range(count)]
+        yield config
+
+
+def grid_configs(args):
+    """Every combination of state options, each state moving on to the next"""
+    options = state_options(args)
+    produced = 0
+    for count in args.states:
+        for states in itertools.product(options, repeat=count):
+            if produced == args.count:
+                return
+            produced += 1
+            yield {"states": list(states)}
+
+
+def load_cache(path):
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, newline="") as f:
+        return {row["hash"]: row for row in csv.DictReader(f)}
+
+
+def write_table(path, rows, append=False):
+    exists = append and os.path.exists(path)
+    with open(path, "a" if append else "w", newline="") as f:
+        writer = csv.DictWriter(f, COLUMNS)
+        if not exists:
+            writer.writeheader()
+        writer.writerows(rows)
+
+
+def number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_where(text):
+    match = re.fullmatch(r"\s*(\w+)\s*(>=|<=|!=|==|>|<)\s*(\S+)\s*", text)
+    if not match or match[1] not in COLUMNS:
+        raise argparse.ArgumentTypeError(f"Expected <column><op><value>: {text}")
+    column, op, value = match.groups()
+    compare = COMPARISONS[op]
+    target = number(value)
+
+    def check(row):
+        if target is None:
+            return compare(str(row[column]), value)
+        actual = number(row[column])
+        return actual is not None and compare(actual, target)
+
+    return check
+
+
+def sort_rows(rows, key):
+    """Sort by a column, descending with a leading -, rows without a value last"""
+    reverse = key.startswith("-")
+    column = key.lstrip("-")
+    present = [r for r in rows if number(r[column]) is not None]
+    missing = [r for r in rows if number(r[column]) is None]
+    present.sort(key=lambda r: number(r[column]), reverse=reverse)
+    return present + missing
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=2000, help="configurations")
+    parser.add_argument("--grid", action="store_true", help="enumerate, not sample")
+    parser.add_argument("--states", type=parse_range, default=parse_range("2-5"))
+    parser.add_argument("--thresholds", type=parse_range, default=parse_range("1-3"))
+    parser.add_argument("--operators", default="+-", help="from + - * /")
+    parser.add_argument("--operands", type=parse_range, default=parse_range("1-9"))
+    parser.add_argument(
+        "--cycle", action="store_true", help="sampled states move on to the next"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--steps", type=int, default=4096, help="steps analyzed")
+    parser.add_argument("--harmonics", type=int, default=8)
+    parser.add_argument("--note", type=int, default=60, help="input note")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count())
+    parser.add_argument("--cache", default="automata_cache.csv", help="'' to disable")
+    parser.add_argument("--out", help="write this sweep's table to this CSV file")
+    parser.add_argument(
+        "--where",
+        type=parse_where,
+        action="append",
+        default=[],
+        help="filter, e.g. period>=8 or status==ok (repeatable)",
+    )
+    parser.add_argument("--sort", default="-entropy", help="column, - for descending")
+    parser.add_argument("--top", type=int, default=10, help="rows to print")
+    args = parser.parse_args()
+
+    settings = {
+        "version": ANALYSIS_VERSION,
+        "steps": args.steps,
+        "harmonics": args.harmonics,
+        "note": args.note,
+    }
+    configs = {}
+    for config in grid_configs(args) if args.grid else random_configs(args):
+        configs.setdefault(config_hash(config, settings), config)
+    # The running default, for reference
+    configs.setdefault(config_hash(DEFAULT_CONFIG, settings), DEFAULT_CONFIG)
+
+    cache = load_cache(args.cache)
+    todo = [h for h in configs if h not in cache]
+    print(
+        f"[explore] {len(configs)} configurations, {len(configs) - len(todo)} cached, "
+        f"analyzing {len(todo)} on {args.jobs} processes"
+    )
+    new_rows = []
+    if todo:
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            results = pool.map(
+                analyze,
+                [configs[h] for h in todo],
+                itertools.repeat(args.steps),
+                itertools.repeat(args.harmonics),
+                itertools.repeat(args.note),
+                chunksize=max(1, len(todo) // (args.jobs * 8)),
+            )
+            for h, row in zip(todo, results):
+                row["hash"] = h
+                new_rows.append(row)
+                cache[h] = row
+        if args.cache:
+            write_table(args.cache, new_rows, append=True)
+
+    rows = [cache[h] for h in configs]
+    for check in args.where:
+        rows = [r for r in rows if check(r)]
+    rows = sort_rows(rows, args.sort)
+    if args.out:
+        write_table(args.out, rows)
+        print(f"[explore] {len(rows)} rows written to {args.out}")
+
+    for r in rows[: args.top]:
+        print(
+            f"[explore] {r['hash']} | period {r['period']:>4} | distinct {r['distinct']:>2} | "
+            f"entropy {r['entropy']:>6} | notes {r['note_min']}-{r['note_max']} | {r['config']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -3,15 +3,21 @@ File watcher service for hot reloading Python files.
 Runs in a background thread and monitors file changes.
 """
 
+import ast
+import hashlib
 import os
 import threading
 import importlib
+from graphlib import TopologicalSorter
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from typing import Optional, Callable, List
 
 
 class FileWatcherService:
+    # Quiet period that ends a burst of events (editors emit several per save)
+    DEBOUNCE = 0.2
+
     def __init__(self, target_files: List[str] = None):
         if target_files is None:
             target_files = [
@@ -27,8 +33,19 @@ class FileWatcherService:
         self.reload_callback = None
         self.ui_callback = None
 
+        # Debounce state, guarded by _lock
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._burst_events = 0
+        self._timer = None
+
+        # Module name -> content hash and -> watched modules it imports
+        self.hashes = {}
+        self.imports = {}
+        self.stats = {"events": 0, "coalesced": 0, "skipped": 0, "reloads": 0}
+
     def set_reload_callback(self, callback: Callable):
-        """Set callback for when handler is reloaded"""
+        """Set callback for when handler is reloaded, called with module names"""
         self.reload_callback = callback
 
     def set_ui_callback(self, callback: Callable):
@@ -41,6 +58,9 @@ class FileWatcherService:
             return
 
         try:
+            for path in self.target_files:
+                self._scan(path)
+
             self.observer = Observer()
             handler = ReloadHandler(self.target_files, self._on_file_modified)
             self.observer.schedule(handler, ".", recursive=False)
@@ -58,19 +78,105 @@ class FileWatcherService:
 
     def stop(self):
         """Stop the file watcher"""
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
         if self.observer and self.running:
             self.observer.stop()
             self.observer.join()
             self.running = False
             print("[watcher] File watcher stopped")
 
+    def get_stats(self):
+        """Counters for events seen, coalesced into bursts, skipped and reloads"""
+        return dict(self.stats)
+
+    def _module_name(self, path):
+        return os.path.splitext(os.path.basename(path))[0]
+
+    def _scan(self, path):
+        """Hash a file and record which watched modules it imports"""
+        with open(path, "rb") as f:
+            source = f.read()
+        module = self._module_name(path)
+        watched = {self._module_name(p) for p in self.target_files}
+        imports = set()
+        try:
+            for node in ast.walk(ast.parse(source)):
+                if isinstance(node, ast.Import):
+                    imports.update(alias.name.split(".")[0] for alias in node.names)
+                elif (
+                    isinstance(node, ast.ImportFrom) and node.module and not node.level
+                ):
+                    imports.add(node.module.split(".")[0])
+        except SyntaxError:
+            # Half-saved file: keep the previous edges
+            imports = self.imports.get(module, set())
+        self.imports[module] = (imports & watched) - {module}
+        digest = hashlib.blake2b(source, digest_size=16).digest()
+        changed = self.hashes.get(module) != digest
+        self.hashes[module] = digest
+        return changed
+
+    def _reload_order(self, changed):
+        """Changed modules and everything that imports them, dependencies first"""
+        affected = set(changed)
+        frontier = list(changed)
+        while frontier:
+            module = frontier.pop()
+            for dependent, imports in self.imports.items():
+                if module in imports and dependent not in affected:
+                    affected.add(dependent)
+                    frontier.append(dependent)
+        sorter = TopologicalSorter(
+            {module: self.imports.get(module, set()) & affected for module in affected}
+        )
+        return list(sorter.static_order())
+
     def _on_file_modified(self, modified_file):
-        """Called when a target file is modified"""
-        print(f"[watcher] {os.path.basename(modified_file)} modified, reloading...")
+        """Called for each file event, restarts the debounce timer"""
+        with self._lock:
+            self.stats["events"] += 1
+            self._pending.add(modified_file)
+            self._burst_events += 1
+            if self._timer:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.DEBOUNCE, self._flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush(self):
+        """Reload once for a burst of events, skipping unchanged content"""
+        with self._lock:
+            pending, self._pending = self._pending, set()
+            self.stats["coalesced"] += self._burst_events - 1
+            self._burst_events = 0
+            self._timer = None
+
+        changed = []
+        for path in sorted(pending):
+            try:
+                if self._scan(path):
+                    changed.append(self._module_name(path))
+                else:
+                    self.stats["skipped"] += 1
+            except OSError as e:
+                print(f"[watcher] Error reading {os.path.basename(path)}: {e}")
+        if not changed:
+            print("[watcher] Content unchanged, reload skipped")
+            return
+
+        modules = self._reload_order(changed)
+        self.stats["reloads"] += 1
+        print(
+            f"[watcher] {', '.join(changed)} modified, reloading {', '.join(modules)} "
+            f"({self.stats['coalesced']} events coalesced, {self.stats['skipped']} unchanged skipped so far)"
+        )
 
         # Call reload callback
         if self.reload_callback:
-            self.reload_callback()
+            self.reload_callback(modules)
 
         # Notify UI
         if self.ui_callback:
@@ -86,3 +192,9 @@ class ReloadHandler(FileSystemEventHandler):
         modified_path = os.path.abspath(event.src_path)
         if modified_path in self.target_paths:
             self.callback(modified_path)
+
+    def on_moved(self, event):
+        # Editors that save atomically rename a temp file over the target
+        moved_path = os.path.abspath(event.dest_path)
+        if moved_path in self.target_paths:
+            self.callback(moved_path)
@@ -1,18 +1,31 @@
 import math
+import functools
+from array import array
 from counting_automaton import CountingAutomaton
 
 
+@functools.lru_cache(maxsize=None)
+def harmonic_table(n_harmonics):
+    """Semitone offsets of the first n harmonics, shared between processors"""
+    return tuple(int(round(12 * math.log2(n), 2)) for n in range(1, n_harmonics + 1))
+
+
 class HarmonicProcessor:
     """
-    Processor that applies a harmonic to a note using a counting automaton. The counting automaton is used to determine the harmonic to apply.
+    Processor that applies a harmonic to a note using a counting automaton. The counting automaton is used to determine the harmonic to apply, built from the automaton description given (the default automaton when None).
     """
 
-    def __init__(self, n_harmonics=8):
+    # Processors that add timed output (echo, strum, arpeggio) override
+    # timed_output() and set this, raw mode then sends their notes through
+    # the handler
+    timed = False
+
+    def __init__(self, n_harmonics=8, automaton=None):
         self.n_harmonics = n_harmonics
-        self.harmonics = [
-            int(round(12 * math.log2(n), 2)) for n in range(1, n_harmonics + 1)
-        ]
-        self.automaton = CountingAutomaton()
+        self.harmonics = harmonic_table(n_harmonics)
+        self.automaton_config = automaton
+        # Compiled form: step() is a table lookup plus an add
+        self.automaton = CountingAutomaton(automaton).compile()
         self.index = 0
 
     def process(self, note):
@@ -20,6 +33,45 @@ class HarmonicProcessor:
         delta = self.harmonics[self.index]
         return delta + note
 
+    def timed_output(self, msg, is_off):
+        """
+        Messages to send after the output note msg (not to be modified), as
+        scheduler.Scheduled entries. Nothing by default.
+        """
+        return ()
+
+    def process_batch(self, notes):
+        """
+        Process a batch of notes, advancing the automaton by exactly len(notes) steps. Accepts a NumPy array, array.array, bytes or any sequence of ints and returns (output notes, harmonic indices), identical to calling process() in a loop. Results are NumPy arrays when numpy is installed, array.array("q") otherwise.
+        """
+        # Imported here so live startup does not pay for numpy
+        try:
+            import numpy
+        except ImportError:  # optional, falls back to array.array
+            numpy = None
+
+        count = len(notes)
+        if numpy is not None:
+            if isinstance(notes, (bytes, bytearray)):
+                notes = numpy.frombuffer(notes, dtype=numpy.uint8)
+            indices = self.automaton.take_array(count) % self.n_harmonics
+            if indices.dtype == object:
+                # Values past int64 (the * operator), the indices themselves are small
+                indices = indices.astype(numpy.int64)
+            output = (
+                numpy.asarray(notes, dtype=numpy.int64)
+                + numpy.asarray(self.harmonics)[indices]
+            )
+        else:
+            harmonics = self.harmonics
+            indices = array(
+                "q", [v % self.n_harmonics for v in self.automaton.take(count)]
+            )
+            output = array("q", [harmonics[i] + n for i, n in zip(indices, notes)])
+        if count:
+            self.index = int(indices[-1])
+        return output, indices
+
     def __str__(self):
         str_parts = []
         for i, h in enumerate(self.harmonics):
@@ -0,0 +1,183 @@
+"""
+Append-only binary event journal for the MIDI service.
+Every input and output event is a fixed 24-byte record: timestamp, automaton
+steps, kind, input port, channel, harmonic index and up to 3 raw MIDI bytes.
+Records are packed into preallocated buffers on the MIDI thread and written by
+a background thread. Memory is bounded by the buffer pool: when the writer
+falls behind, records are dropped and counted rather than queued, and a GAP
+record with their count is written where they would have been.
+"""
+
+import mmap
+import queue
+import struct
+import threading
+import time
+
+MAGIC = b"WNDJ"
+VERSION = 2
+# magic, version, record size, wall clock start (ns)
+HEADER = struct.Struct("<4sHHq")
+# time since start (ns), automaton steps, kind, input port, channel, harmonic
+# index, byte length, bytes (longer messages such as sysex are truncated)
+RECORD = struct.Struct("<qQBBBBB3s")
+
+# Record kinds
+INPUT = 0
+OUTPUT = 1
+RESET = 2  # active notes cleared (all notes off / panic)
+GAP = 3  # records dropped while the writer was behind, count in steps
+
+NONE = 255  # no channel / harmonic index
+
+
+class EventJournal:
+    def __init__(self, path, buffer_records=4096, buffers=8):
+        self.path = path
+        self.buffer_size = RECORD.size * buffer_records
+        self._free = queue.SimpleQueue()
+        for _ in range(buffers):
+            self._free.put(bytearray(self.buffer_size))
+        self._full = queue.SimpleQueue()
+        self._buffer = None
+        self._offset = 0
+        self._lock = threading.Lock()
+        self._file = None
+        self._thread = None
+        # Set by close(), the writer stops handing buffers back
+        self._closing = False
+        # Records dropped since the last buffer was lost to the writer
+        self._gap = 0
+        self.start_ns = 0
+        self.stats = {"records": 0, "dropped": 0, "gaps": 0, "bytes": 0}
+
+    def open(self):
+        self._file = open(self.path, "wb")
+        self.start_ns = time.perf_counter_ns()
+        self._file.write(HEADER.pack(MAGIC, VERSION, RECORD.size, time.time_ns()))
+        self._buffer = self._free.get()
+        self._offset = 0
+        self._closing = False
+        self._gap = 0
+        self._thread = threading.Thread(target=self._write_loop, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Flush buffered records and close the file"""
+        if not self._file:
+            return
+        with self._lock:
+            self._closing = True
+            if self._buffer is not None and self._offset:
+                self._full.put((self._buffer, self._offset))
+            self._buffer = None
+        self._full.put(None)
+        self._thread.join()
+        self._file.close()
+        self._file = None
+
+    def record(self, kind, timestamp, data, channel, steps, index, port=0):
+        """Append one record (any thread), timestamp is a perf_counter_ns() value"""
+        with self._lock:
+            buffer = self._buffer
+            if buffer is None:
+                self.stats["dropped"] += 1
+                if not self._closing:
+                    self._gap += 1
+                return
+            length = len(data)
+            RECORD.pack_into(
+                buffer,
+                self._offset,
+                timestamp - self.start_ns,
+                steps,
+                kind,
+                port,
+                NONE if channel is None else channel,
+                NONE if index is None else index,
+                length if length < NONE else NONE,
+                bytes(data[:3]),
+            )
+            self._offset += RECORD.size
+            self.stats["records"] += 1
+            if self._offset == self.buffer_size:
+                self._full.put((buffer, self._offset))
+                try:
+                    self._buffer = self._free.get_nowait()
+                except queue.Empty:
+                    # Writer is behind: drop records until a buffer comes back
+                    self._buffer = None
+                self._offset = 0
+
+    def _write_loop(self):
+        while True:
+            item = self._full.get()
+            if item is None:
+                break
+            buffer, size = item
+            try:
+                self._file.write(memoryview(buffer)[:size])
+                self.stats["bytes"] += size
+            except Exception as e:
+                print(f"[journal] Error writing journal: {e}")
+            with self._lock:
+                if self._buffer is None and not self._closing:
+                    self._buffer = buffer
+                    self._offset = 0
+                    if self._gap:
+                        # Mark where records were dropped, so replays know
+                        RECORD.pack_into(
+                            buffer,
+                            0,
+                            time.perf_counter_ns() - self.start_ns,
+                            self._gap,
+                            GAP,
+                            0,
+                            NONE,
+                            NONE,
+                            0,
+                            b"",
+                        )
+                        self._offset = RECORD.size
+                        self.stats["gaps"] += 1
+                        self._gap = 0
+                else:
+                    self._free.put(buffer)
+        self._file.flush()
+
+
+class JournalReader:
+    """Memory-mapped journal, iterated as RECORD tuples without loading the file"""
+
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, record_size, self.started = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+            self.close()
+            raise ValueError(f"Not a journal (version {VERSION}): {path}")
+        self.version = version
+        # A partial trailing record (crash mid-write) is ignored
+        count = (len(self._map) - HEADER.size) // RECORD.size
+        self._records = memoryview(self._map)[
+            HEADER.size : HEADER.size + count * RECORD.size
+        ]
+
+    def __len__(self):
+        return len(self._records) // RECORD.size
+
+    def __iter__(self):
+        return RECORD.iter_unpack(self._records)
+
+    def close(self):
+        if getattr(self, "_records", None) is not None:
+            self._records.release()
+            self._records = None
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,91 @@
+"""
+Log service for headless mode.
+Writes MIDI events as plain text lines to stdout or a file instead of the UI.
+The MIDI thread only queues snapshots, a consumer thread formats and writes
+them, so logging adds no formatting or I/O to the MIDI path.
+"""
+
+import sys
+import threading
+from collections import deque
+
+
+class LogService:
+    # Snapshots kept while the writer is behind, older ones are dropped
+    QUEUE_SIZE = 65536
+    # Seconds between writes of queued lines
+    FLUSH_INTERVAL = 0.05
+
+    def __init__(self, presentation_service, path=None):
+        self.presentation_service = presentation_service
+        self.path = path
+        self.stream = None
+        # deque.append/popleft are atomic, so the producer never takes a lock
+        self._events = deque(maxlen=self.QUEUE_SIZE)
+        self._stop_event = threading.Event()
+        self._writer = None
+        self.stats = {"queued": 0, "dropped": 0, "written": 0}
+
+    def start(self):
+        """Open the log destination and start the writer thread"""
+        if self.path:
+            self.stream = open(self.path, "a", buffering=1 << 16)
+            print(f"[log] Logging MIDI events to {self.path}")
+        else:
+            self.stream = sys.stdout
+        self._stop_event.clear()
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def stop(self):
+        """Write what is queued, then flush and close the log destination"""
+        self._stop_event.set()
+        if self._writer:
+            self._writer.join(timeout=1.0)
+            self._writer = None
+        self.flush()
+        if self.stream and self.stream is not sys.stdout:
+            self.stream.close()
+        self.stream = None
+
+    def update_midi_status(self, msg, display_data, channel):
+        """Queue a MIDI event to log (MIDI thread, same interface as UIService)"""
+        if len(self._events) == self.QUEUE_SIZE:
+            self.stats["dropped"] += 1
+        self._events.append((channel, display_data))
+        self.stats["queued"] += 1
+
+    def notify_reload(self):
+        """Log a handler reload"""
+        self._events.append((None, None))
+
+    def flush(self):
+        """Format and write queued events (writer thread)"""
+        stream = self.stream
+        if not stream:
+            return
+        render = self.presentation_service.render_text
+        lines = []
+        while True:
+            try:
+                channel, display_data = self._events.popleft()
+            except IndexError:
+                break
+            if channel is None:
+                lines.append("[log] Handler reloaded\n")
+            else:
+                lines.append(f"[ch {channel:02d}] {render(display_data)}\n")
+        if lines:
+            stream.write("".join(lines))
+            self.stats["written"] += len(lines)
+
+    def get_stats(self):
+        """Snapshot of log queue counters"""
+        return dict(self.stats, pending=len(self._events))
+
+    def _write_loop(self):
+        while not self._stop_event.wait(self.FLUSH_INTERVAL):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[log] Error writing MIDI events: {e}")
@@ -0,0 +1,132 @@
+"""
+In-memory loopback port backend.
+Stands in for mido's open_input/open_output so MidiService can run without
+virtual ALSA/CoreMIDI ports: an output port delivers to every input port
+opened under the same name, on the sender's thread like a backend callback.
+Ports also have the raw byte interface of rtmidi's MidiIn/MidiOut
+(set_callback and send_message) for MidiService's raw input mode.
+"""
+
+import queue
+import threading
+import mido
+
+
+class LoopbackInput:
+    """Input port: delivers to a callback or queues for receive()/iter_pending()"""
+
+    def __init__(self, backend, name, callback=None):
+        self.backend = backend
+        self.name = name
+        self.callback = callback
+        self.raw_callback = None
+        self.closed = False
+        self._queue = queue.SimpleQueue()
+
+    def _deliver(self, msg):
+        callback = self.callback
+        if callback is not None:
+            callback(msg)
+        else:
+            self._queue.put(msg)
+
+    def _deliver_bytes(self, data):
+        raw_callback = self.raw_callback
+        if raw_callback is not None:
+            # rtmidi calls back with ([status, data...], delta time) and user data
+            raw_callback((list(data), 0.0), None)
+        else:
+            try:
+                self._deliver(mido.Message.from_bytes(data))
+            except ValueError:
+                pass
+
+    def set_callback(self, func, data=None):
+        """Receive raw bytes like rtmidi's MidiIn.set_callback, instead of messages"""
+        self.raw_callback = func
+
+    def cancel_callback(self):
+        self.raw_callback = None
+
+    def receive(self, block=True):
+        try:
+            return self._queue.get(block)
+        except queue.Empty:
+            return None
+
+    def poll(self):
+        return self.receive(block=False)
+
+    def iter_pending(self):
+        while True:
+            msg = self.poll()
+            if msg is None:
+                return
+            yield msg
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.backend._disconnect(self)
+
+
+class LoopbackOutput:
+    """Output port: copies each message to the inputs connected to its name"""
+
+    def __init__(self, backend, name):
+        self.backend = backend
+        self.name = name
+        self.closed = False
+
+    def send(self, msg):
+        for port in self.backend._inputs(self.name):
+            if port.raw_callback is not None:
+                port._deliver_bytes(msg.bytes())
+            else:
+                # Copy like a real port would, handlers mutate messages in place
+                port._deliver(msg.copy())
+
+    def send_message(self, data):
+        """Send raw bytes like rtmidi's MidiOut.send_message"""
+        for port in self.backend._inputs(self.name):
+            port._deliver_bytes(data)
+
+    def reset(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class LoopbackBackend:
+    """Port backend with the open_input/open_output interface of the mido module"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._connections = {}
+
+    def open_input(self, name=None, virtual=False, callback=None, **kwargs):
+        port = LoopbackInput(self, name, callback)
+        with self._lock:
+            # Copy on write, so send() can iterate without taking the lock
+            self._connections[name] = self._connections.get(name, ()) + (port,)
+        return port
+
+    def open_output(self, name=None, virtual=False, **kwargs):
+        return LoopbackOutput(self, name)
+
+    def get_input_names(self):
+        return list(self._connections)
+
+    def get_output_names(self):
+        return list(self._connections)
+
+    def _inputs(self, name):
+        return self._connections.get(name, ())
+
+    def _disconnect(self, port):
+        with self._lock:
+            ports = tuple(
+                p for p in self._connections.get(port.name, ()) if p is not port
+            )
+            self._connections[port.name] = ports
@@ -2,28 +2,87 @@
 """
 Main entrypoint for the Wanderer MIDI application.
 Coordinates MIDI processing, UI, and file watching services.
+
+    python main.py                          # MIDI, UI and file watcher
+    python main.py --headless --no-watch    # MIDI only, events logged to stdout
+    python main.py --listen :5004 --peer 10.0.0.2:5004   # MIDI over UDP
 """
 
+import argparse
 import threading
 import time
 import signal
 import sys
 from midi_service import MidiService
-from ui_service import UIService
-from file_watcher_service import FileWatcherService
+from routing import RoutingTable
+from counting_automaton import load_config
+from thinning import TYPES
 
 
 class App:
-    def __init__(self):
-        self.midi_service = MidiService()
-        self.ui_service = UIService(self.midi_service.presentation_service)
-        self.file_watcher = FileWatcherService()
+    def __init__(
+        self,
+        headless=False,
+        watch=True,
+        log_path=None,
+        input_mode="callback",
+        note_delay=0.0,
+        journal_path=None,
+        theme=None,
+        routing_path=None,
+        listen=None,
+        peers=(),
+        automaton_path=None,
+        thinning=None,
+    ):
+        # MIDI over UDP instead of virtual ports, when listening or sending
+        self.network = None
+        if listen or peers:
+            from network_backend import NetworkBackend, parse_address
+
+            self.network = NetworkBackend(
+                bind=parse_address(listen or ":5004"),
+                peers=[parse_address(peer, "127.0.0.1") for peer in peers],
+            )
+        self.midi_service = MidiService(
+            input_mode=input_mode,
+            note_delay=note_delay,
+            journal_path=journal_path,
+            routing=RoutingTable.load(routing_path) if routing_path else None,
+            port_backend=self.network,
+            automaton=load_config(automaton_path) if automaton_path else None,
+            thinning=thinning,
+        )
+        if theme:
+            self.midi_service.presentation_service.set_theme(theme)
+        self.headless = headless
+        self._stopped = threading.Event()
+
+        # GUI and watcher modules (webview, watchdog) are only imported when enabled
+        if headless:
+            from log_service import LogService
+
+            self.ui_service = LogService(
+                self.midi_service.presentation_service, log_path
+            )
+        else:
+            from ui_service import UIService
+
+            self.ui_service = UIService(self.midi_service.presentation_service)
+
+        if watch:
+            from file_watcher_service import FileWatcherService
+
+            self.file_watcher = FileWatcherService()
+        else:
+            self.file_watcher = None
 
         # Connect services
         self._connect_services()
 
-        # Set up signal handler for Ctrl-C
+        # Set up signal handler for Ctrl-C (and SIGTERM from service managers)
         signal.signal(signal.SIGINT, self._signal_handler)
+        signal.signal(signal.SIGTERM, self._signal_handler)
 
     def _connect_services(self):
         """Connect services for communication"""
@@ -31,11 +90,13 @@ class App:
         self.midi_service.set_ui_callback(self.ui_service.update_midi_status)
 
         # UI service needs reference to MIDI service for cleanup
-        self.ui_service.set_midi_service(self.midi_service)
+        if not self.headless:
+            self.ui_service.set_midi_service(self.midi_service)
 
         # File watcher can reload handler and notify UI
-        self.file_watcher.set_reload_callback(self.midi_service.reload_handler)
-        self.file_watcher.set_ui_callback(self.ui_service.notify_reload)
+        if self.file_watcher:
+            self.file_watcher.set_reload_callback(self.midi_service.reload_handler)
+            self.file_watcher.set_ui_callback(self.ui_service.notify_reload)
 
     def _signal_handler(self, signum, frame):
         """Handle Ctrl-C signal"""
@@ -49,11 +110,19 @@ class App:
 
         try:
             # Start background services
+            if self.headless:
+                self.ui_service.start()
             self.midi_service.start()
-            self.file_watcher.start()
+            if self.file_watcher:
+                self.file_watcher.start()
 
-            # Run UI on main thread (this will block until UI closes)
-            self.ui_service.run()
+            if self.headless:
+                # Nothing to run on the main thread, wait for a signal
+                while not self._stopped.wait(0.5):
+                    pass
+            else:
+                # Run UI on main thread (this will block until UI closes)
+                self.ui_service.run()
 
         except KeyboardInterrupt:
             print("\n[app] Shutting down...")
@@ -63,12 +132,89 @@ class App:
     def shutdown(self):
         """Clean shutdown of all services"""
         print("[app] Shutting down services...")
+        self._stopped.set()
         # MIDI service stop() calls all_notes_off()
         self.midi_service.stop()
-        self.file_watcher.stop()
+        if self.network:
+            self.network.close()
+        if self.file_watcher:
+            self.file_watcher.stop()
+        if self.headless:
+            self.ui_service.stop()
         print("[app] Shutdown complete")
 
 
+def parse_thinning(values):
+    """ "5" (every thinnable type) or "pitchwheel=2" arguments to windows in seconds"""
+    thinning = {}
+    for value in values:
+        name, _, ms = value.rpartition("=")
+        for msg_type in TYPES if name in ("", "all") else (name,):
+            thinning[msg_type] = float(ms) / 1000
+    return thinning or None
+
+
 if __name__ == "__main__":
-    app = App()
+    parser = argparse.ArgumentParser(description="Wanderer MIDI application")
+    parser.add_argument(
+        "--headless", action="store_true", help="run without the UI, log events instead"
+    )
+    parser.add_argument(
+        "--no-watch", action="store_true", help="disable hot reloading on file changes"
+    )
+    parser.add_argument("--log", help="headless event log file (default: stdout)")
+    parser.add_argument(
+        "--input-mode",
+        choices=MidiService.INPUT_MODES,
+        default="callback",
+        help="MIDI input handling, raw skips mido parsing for notes",
+    )
+    parser.add_argument(
+        "--note-delay", type=float, default=0.0, help="delay output notes by ms"
+    )
+    parser.add_argument("--journal", help="record every MIDI event to this file")
+    parser.add_argument("--theme", help="UI theme under themes/, e.g. ayu.dark")
+    parser.add_argument(
+        "--routing", help="port and channel routing config (JSON), see routing.py"
+    )
+    parser.add_argument(
+        "--listen", help="receive MIDI over UDP on [host]:port instead of virtual ports"
+    )
+    parser.add_argument(
+        "--peer",
+        action="append",
+        default=[],
+        help="send MIDI over UDP to host:port (repeatable)",
+    )
+    parser.add_argument(
+        "--automaton", help="automaton description (JSON), see counting_automaton.py"
+    )
+    parser.add_argument(
+        "--thin",
+        action="append",
+        default=[],
+        metavar="[TYPE=]MS",
+        help="coalesce controller, aftertouch and pitch bend bursts within MS "
+        f"(one of {', '.join(TYPES)} or all, repeatable)",
+    )
+    args = parser.parse_args()
+    if args.thin and args.journal:
+        parser.error(
+            "--thin cannot be combined with --journal (replays need every message)"
+        )
+
+    app = App(
+        headless=args.headless,
+        watch=not args.no_watch,
+        log_path=args.log,
+        input_mode=args.input_mode,
+        note_delay=args.note_delay / 1000,
+        journal_path=args.journal,
+        theme=args.theme,
+        routing_path=args.routing,
+        listen=args.listen,
+        peers=args.peer,
+        automaton_path=args.automaton,
+        thinning=parse_thinning(args.thin),
+    )
     app.run()
@@ -0,0 +1,213 @@
+"""
+Low-overhead latency and throughput metrics for the MIDI path.
+Histograms are HDR style: fixed log-linear buckets, so recording is a few
+integer operations and an array increment, with no allocation.
+"""
+
+import json
+import threading
+import time
+from array import array
+
+
+class Histogram:
+    """
+    Log-linear histogram of non-negative integers (nanoseconds here). Values below 2**SUB_BITS are exact, above that each power of two is split into 2**(SUB_BITS - 1) buckets, about 1.5% relative precision.
+    """
+
+    SUB_BITS = 7
+    MAX_BITS = 40  # ~18 minutes in ns, larger values land in the last bucket
+
+    def __init__(self):
+        half = 1 << (self.SUB_BITS - 1)
+        size = (1 << self.SUB_BITS) + (self.MAX_BITS - self.SUB_BITS) * half
+        self.counts = array("Q", bytes(8 * size))
+        # record() index: (1 << SUB_BITS) + (shift - 1) * half + mantissa - half
+        self._base = (1 << self.SUB_BITS) - 2 * half
+        self._half_bits = self.SUB_BITS - 1
+        self._size = size
+        self.count = 0
+        self.max = 0
+
+    def _index(self, value):
+        shift = value.bit_length() - self.SUB_BITS
+        if shift <= 0:
+            return value
+        half = 1 << (self.SUB_BITS - 1)
+        index = (1 << self.SUB_BITS) + (shift - 1) * half + (value >> shift) - half
+        return min(index, len(self.counts) - 1)
+
+    def _value(self, index):
+        """Upper bound of a bucket"""
+        full = 1 << self.SUB_BITS
+        if index < full:
+            return index
+        half = full >> 1
+        shift, mantissa = divmod(index - full, half)
+        shift += 1
+        return ((mantissa + half + 1) << shift) - 1
+
+    def record(self, value):
+        # Same as _index(), inlined for the hot path
+        if value < 0:
+            value = 0
+        shift = value.bit_length() - self.SUB_BITS
+        if shift <= 0:
+            index = value
+        else:
+            index = self._base + (shift << self._half_bits) + (value >> shift)
+            if index >= self._size:
+                index = self._size - 1
+        self.counts[index] += 1
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """Add another histogram's counts into this one"""
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.count += other.count
+        self.max = max(self.max, other.max)
+
+    def percentile(self, p):
+        """Value at percentile p (0-100), within bucket precision"""
+        if not self.count:
+            return 0
+        target = max(1, int(self.count * p / 100 + 0.5))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(self._value(index), self.max)
+        return self.max
+
+    def summary(self, scale=1e-3):
+        """p50/p95/p99/max, scaled (ns to us by default)"""
+        return {
+            "count": self.count,
+            "p50": self.percentile(50) * scale,
+            "p95": self.percentile(95) * scale,
+            "p99": self.percentile(99) * scale,
+            "max": self.max * scale,
+        }
+
+
+class MidiMetrics:
+    """
+    Per-channel latency histograms and message counters for MidiService. Latencies are measured from ingress to each stage: after the handler, after the output send and after the UI callback.
+    """
+
+    STAGES = ("processed", "sent", "displayed")
+
+    def __init__(self):
+        self.channels = {}
+        self.started = time.monotonic()
+        # Rate window per reader: name -> (time of its last report, counts then)
+        self._windows = {}
+        self._dump_thread = None
+        self._dump_stop = threading.Event()
+
+    def _channel(self, channel):
+        stats = self.channels.get(channel)
+        if stats is None:
+            stats = {
+                "types": {},
+                "stages": {stage: Histogram() for stage in self.STAGES},
+            }
+            self.channels[channel] = stats
+        return stats
+
+    def record(self, msg, received, processed, sent, displayed):
+        """Record one message, timestamps are perf_counter_ns() values"""
+        self.record_event(
+            getattr(msg, "channel", None),
+            msg.type,
+            received,
+            processed,
+            sent,
+            displayed,
+        )
+
+    def record_event(self, channel, msg_type, received, processed, sent, displayed):
+        """Record one message by channel and type, for paths without a Message"""
+        stats = self._channel(channel)
+        types = stats["types"]
+        types[msg_type] = types.get(msg_type, 0) + 1
+        if received is not None:
+            stages = stats["stages"]
+            stages["processed"].record(processed - received)
+            stages["sent"].record(sent - received)
+            stages["displayed"].record(displayed - received)
+
+    def total_messages(self):
+        return sum(
+            sum(stats["types"].values()) for stats in list(self.channels.values())
+        )
+
+    def merged(self, stage):
+        """One stage's latency histogram over all channels"""
+        histogram = Histogram()
+        for stats in list(self.channels.values()):
+            histogram.merge(stats["stages"][stage])
+        return histogram
+
+    def report(self, window="query"):
+        """
+        Latency summaries (us) and message rates since the previous report for
+        the same window, so periodic dumps and queries don't reset each other
+        """
+        now = time.monotonic()
+        last_report, last_counts = self._windows.get(window, (self.started, {}))
+        elapsed = max(now - last_report, 1e-9)
+        channels = {}
+        counts = {}
+        for channel, stats in list(self.channels.items()):
+            types = dict(stats["types"])
+            rates = {}
+            for msg_type, count in types.items():
+                key = (channel, msg_type)
+                counts[key] = count
+                rates[msg_type] = (count - last_counts.get(key, 0)) / elapsed
+            channels["-" if channel is None else str(channel)] = {
+                "messages": types,
+                "rates": rates,
+                "latency_us": {
+                    stage: histogram.summary()
+                    for stage, histogram in stats["stages"].items()
+                },
+            }
+        self._windows[window] = (now, counts)
+        return {
+            "time": time.time(),
+            "uptime": now - self.started,
+            "channels": channels,
+        }
+
+    def dump(self, path):
+        """Append a report to a JSON lines file"""
+        with open(path, "a") as f:
+            f.write(json.dumps(self.report("dump")) + "\n")
+
+    def start_dump(self, path, interval=10.0):
+        """Periodically dump reports to a file in a background thread"""
+        if self._dump_thread:
+            return
+        self._dump_stop.clear()
+
+        def dump_loop():
+            while not self._dump_stop.wait(interval):
+                try:
+                    self.dump(path)
+                except Exception as e:
+                    print(f"[metrics] Error dumping metrics: {e}")
+
+        self._dump_thread = threading.Thread(target=dump_loop, daemon=True)
+        self._dump_thread.start()
+
+    def stop_dump(self):
+        if self._dump_thread:
+            self._dump_stop.set()
+            self._dump_thread.join(timeout=1.0)
+            self._dump_thread = None
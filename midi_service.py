@@ -3,30 +3,147 @@ MIDI service for handling MIDI I/O and message processing.
 Runs in a background thread to avoid blocking the main thread.
 """
 
+import sys
+import functools
 import threading
 import time
+import queue
 import mido
 import importlib
+from dataclasses import dataclass
+from mido.messages.specs import SPEC_BY_STATUS
 from harmonic_processor import HarmonicProcessor
 from presentation_service import PresentationService
+from metrics import MidiMetrics
+from voice_table import VoiceTable
+from scheduler import OutputScheduler, Scheduled
+from journal import EventJournal, INPUT, OUTPUT, RESET
+from routing import RoutingTable
+from thinning import Thinner
+
+# Channel mode controllers
+ALL_SOUND_OFF = 120
+ALL_NOTES_OFF = 123
+
+
+@dataclass
+class HandlerSwap:
+    """Reloaded handler state, built off the MIDI thread and swapped in between messages"""
+
+    generation: int
+    published_ns: int
+    presentation_service: object
+    processor_class: type
+    processors: dict
+    # Automaton steps of the old processor each new one was advanced to
+    built_at: dict
 
 
 class MidiService:
-    def __init__(self):
-        self.inport = None
-        self.outport = None
+    # Input modes: "callback" wakes the worker from the backend's receive
+    # callback, "poll" drains iter_pending() on a 1 ms sleep loop, "raw" is
+    # "callback" on rtmidi's raw bytes, with note-on/off handled without mido
+    INPUT_MODES = ("callback", "poll", "raw")
+
+    # Modules reload_handler can swap in live, in dependency order
+    HANDLER_MODULES = (
+        "counting_automaton",
+        "harmonic_processor",
+        "presentation_service",
+    )
+
+    def __init__(
+        self,
+        input_mode="callback",
+        port_backend=None,
+        metrics=True,
+        metrics_path=None,
+        metrics_interval=10.0,
+        note_delay=0.0,
+        journal_path=None,
+        routing=None,
+        automaton=None,
+        thinning=None,
+    ):
+        if input_mode not in self.INPUT_MODES:
+            raise ValueError(f"Unknown input mode: {input_mode}")
+        if thinning and journal_path:
+            # Journaled sessions keep every message on the full path for exact
+            # replays, thinning would silently be off
+            raise ValueError("Thinning cannot be combined with a journal")
+
+        self.input_mode = input_mode
+        # Anything with mido's open_input/open_output, e.g. LoopbackBackend
+        self.port_backend = port_backend or mido
+        # Ports and the (port, channel) -> processor, output routes between them
+        self.routing = routing or RoutingTable(["PY MIDI In"], ["PY MIDI Out"])
+        self.inports = [None] * len(self.routing.inputs)
+        self.outports = [None] * len(self.routing.outputs)
         self.running = False
         self.thread = None
         self.ui_callback = None
         self.presentation_service = PresentationService()
 
-        # MIDI port names
-        self.IN_NAME = "PY MIDI In"
-        self.OUT_NAME = "PY MIDI Out"
+        # (ingress timestamp, message, input port index) from the input ports'
+        # callback threads, all serviced by the one worker thread, and resets
+        # posted by all_notes_off() and panic() in between
+        self._queue = queue.SimpleQueue()
+
+        # Latency and throughput metrics, None when switched off
+        self.metrics = MidiMetrics() if metrics else None
+        self.metrics_path = metrics_path
+        self.metrics_interval = metrics_interval
+
+        # UI update for the current message, delivered after its output is sent
+        self._display = None
+
+        # Timed output: note messages are sent note_delay seconds late when set
+        self.scheduler = OutputScheduler()
+        self.note_delay = note_delay
+        # Coalescing of controller/aftertouch/bend bursts, seconds per message type
+        self.thinner = Thinner(thinning) if thinning else None
+
+        # Binary journal of every input and output event, None when off
+        self.journal = EventJournal(journal_path) if journal_path else None
+
+        # Raw mode: output ports' send_message and a reused 3-byte buffer
+        self._raw_sends = []
+        self._raw_out = bytearray(3)
+
+        # MIDI port names (the first input and output)
+        self.IN_NAME = self.routing.inputs[0]
+        self.OUT_NAME = self.routing.outputs[0]
 
         # Handler state (moved from handler.py)
-        self.active_notes = {}  # Maps (channel, original_note) -> harmonic_offset
-        self.processors = {1: HarmonicProcessor(n_harmonics=8)}
+        # (port, channel, original_note) -> stack of harmonic notes, preallocated
+        self.active_notes = VoiceTable(len(self.inports), len(self.outports))
+        # Automaton description for new processors, the default one when None
+        self.automaton_config = automaton
+        self.processors = {1: HarmonicProcessor(n_harmonics=8, automaton=automaton)}
+        self.processor_class = HarmonicProcessor
+
+        # Latest reloaded handler, swapped in by the MIDI thread once its
+        # generation differs from the one applied
+        self._swap = None
+        self._reloads = 0
+        self._swap_generation = 0
+        self.swap_stats = {"swaps": 0, "last_wait_us": 0, "last_swap_us": 0}
+
+    @property
+    def inport(self):
+        return self.inports[0]
+
+    @inport.setter
+    def inport(self, port):
+        self.inports[0] = port
+
+    @property
+    def outport(self):
+        return self.outports[0]
+
+    @outport.setter
+    def outport(self, port):
+        self.outports[0] = port
 
     def set_ui_callback(self, callback):
         """Set callback for UI updates"""
@@ -38,15 +155,54 @@ class MidiService:
             return
 
         try:
-            self.inport = mido.open_input(self.IN_NAME, virtual=True)
-            self.outport = mido.open_output(self.OUT_NAME, virtual=True)
-
+            # Fresh queue so a stop sentinel from a previous run is not replayed
+            self._queue = queue.SimpleQueue()
+            # One port per input: on ALSA, rtmidi runs an input thread for each
+            # in every mode, only processing is multiplexed onto the worker
+            for index, name in enumerate(self.routing.inputs):
+                if self.input_mode == "callback":
+                    self.inports[index] = self.port_backend.open_input(
+                        name,
+                        virtual=True,
+                        callback=functools.partial(self._receive, port=index),
+                    )
+                else:
+                    self.inports[index] = self.port_backend.open_input(
+                        name, virtual=True
+                    )
+            for index, name in enumerate(self.routing.outputs):
+                self.outports[index] = self.port_backend.open_output(name, virtual=True)
+            target = {
+                "callback": self._callback_loop,
+                "raw": self._raw_loop,
+                "poll": self._process_loop,
+            }[self.input_mode]
+
+            if self.input_mode == "raw":
+                # rtmidi's MidiIn/MidiOut under mido's ports, or the ports
+                # themselves for backends with the same interface
+                self._raw_sends = [
+                    getattr(port, "_rt", port).send_message for port in self.outports
+                ]
+                for index, port in enumerate(self.inports):
+                    getattr(port, "_rt", port).set_callback(
+                        functools.partial(self._receive_raw, port=index)
+                    )
+
+            if self.journal:
+                self.journal.open()
             self.running = True
-            self.thread = threading.Thread(target=self._process_loop, daemon=True)
+            self.scheduler.start()
+            self.thread = threading.Thread(target=target, daemon=True)
             self.thread.start()
 
+            if self.metrics and self.metrics_path:
+                self.metrics.start_dump(self.metrics_path, self.metrics_interval)
+
+            inputs = ", ".join(f"'{name}'" for name in self.routing.inputs)
+            outputs = ", ".join(f"'{name}'" for name in self.routing.outputs)
             print(
-                f"[midi] Virtual ports: '{self.IN_NAME}' (input), '{self.OUT_NAME}' (output)"
+                f"[midi] Virtual ports: {inputs} (input), {outputs} (output), {self.input_mode} mode"
             )
 
         except Exception as e:
@@ -54,26 +210,75 @@ class MidiService:
             self.running = False
 
     def all_notes_off(self):
-        """Send note off messages for all active notes"""
-        if not self.outport:
+        """Send All Notes Off on every output channel with sounding notes"""
+        if not any(self.outports):
             return
+        self._run_on_worker(self._all_notes_off)
 
+    def panic(self):
+        """Send All Sound Off and All Notes Off on all 16 channels of every output"""
+        if not any(self.outports):
+            return
+        self._run_on_worker(self._panic)
+
+    def _run_on_worker(self, action):
+        """
+        Run a reset on the MIDI thread, after the messages already queued, so
+        notes are cleared (and journaled) in message order. Runs right away
+        when the worker is not running or this is the worker.
+        """
+        thread = self.thread
+        if (
+            self.running
+            and thread is not None
+            and thread.is_alive()
+            and thread is not threading.current_thread()
+        ):
+            self._queue.put(action)
+        else:
+            action()
+
+    def _all_notes_off(self):
         print("[midi] Sending all notes off...")
-        for (channel, original_note), harmonic_note in self.active_notes.items():
-            try:
-                # Send note off for the harmonic note that was actually playing
-                note_off_msg = mido.Message(
-                    "note_off", channel=channel, note=harmonic_note, velocity=0
-                )
-                self.outport.send(note_off_msg)
-            except Exception as e:
-                print(
-                    f"[midi] Error sending note off for channel {channel}, note {harmonic_note}: {e}"
-                )
+        self.scheduler.cancel_all()
+        if self.thinner:
+            self.thinner.clear()
+        self._send_channel_mode(self.active_notes.sounding_targets(), (ALL_NOTES_OFF,))
+        self._clear_notes()
+        print("[midi] All notes off sent")
+
+    def _panic(self):
+        print("[midi] Panic: all sound off on every channel")
+        self.scheduler.cancel_all()
+        if self.thinner:
+            self.thinner.clear()
+        targets = [(p, c) for p in range(len(self.outports)) for c in range(16)]
+        self._send_channel_mode(targets, (ALL_SOUND_OFF, ALL_NOTES_OFF))
+        self._clear_notes()
 
-        # Clear active notes
+    def _clear_notes(self):
         self.active_notes.clear()
-        print("[midi] All notes off sent")
+        if self.journal:
+            # Replays must forget sounding notes at the same point
+            self.journal.record(RESET, time.perf_counter_ns(), b"", None, 0, None)
+
+    def _send_channel_mode(self, targets, controls):
+        """Send channel mode messages (value 0) to each (output port, channel)"""
+        for port, channel in targets:
+            outport = self.outports[port]
+            if outport is None:
+                continue
+            for control in controls:
+                try:
+                    outport.send(
+                        mido.Message(
+                            "control_change", channel=channel, control=control, value=0
+                        )
+                    )
+                except Exception as e:
+                    print(
+                        f"[midi] Error sending CC {control} on channel {channel}: {e}"
+                    )
 
     def stop(self):
         """Stop the MIDI service"""
@@ -81,47 +286,125 @@ class MidiService:
         self.all_notes_off()
 
         self.running = False
+        # Stops the worker once the reset queued above has run
+        self._queue.put(None)
         if self.thread:
             self.thread.join(timeout=1.0)
+        self.scheduler.stop()
+        if self.journal:
+            self.journal.close()
+
+        for port in self.inports + self.outports:
+            if port:
+                port.close()
 
-        if self.inport:
-            self.inport.close()
-        if self.outport:
-            self.outport.close()
+        if self.metrics and self.metrics_path:
+            self.metrics.stop_dump()
+            self.metrics.dump(self.metrics_path)
 
         print("[midi] MIDI service stopped")
 
-    def reload_handler(self):
-        """Reload the handler module (called by file watcher)"""
+    def reload_handler(self, modules=None):
+        """
+        Reload the handler modules (called by file watcher with the changed
+        modules and their dependents, in order). New processors are built here,
+        off the MIDI thread, and picked up between messages.
+        """
+        modules = [
+            m for m in (modules or self.HANDLER_MODULES) if m in self.HANDLER_MODULES
+        ]
+        if not modules:
+            print("[midi] No handler modules changed, nothing to reload")
+            return
+
         try:
             # Import and reload modules
-            import harmonic_processor
-            import presentation_service
-
-            importlib.reload(harmonic_processor)
-            importlib.reload(presentation_service)
-
-            # Recreate presentation service with reloaded module
-            self.presentation_service = presentation_service.PresentationService()
+            for module in modules:
+                importlib.reload(importlib.import_module(module))
+            harmonic_processor = sys.modules["harmonic_processor"]
+            presentation_service = sys.modules["presentation_service"]
+
+            # Build new processors at the current automaton positions
+            processors = {}
+            built_at = {}
+            for channel, old in list(self.processors.items()):
+                processor = harmonic_processor.HarmonicProcessor(
+                    n_harmonics=old.n_harmonics, automaton=old.automaton_config
+                )
+                built_at[channel] = old.automaton.steps
+                processor.automaton.advance(built_at[channel])
+                processors[channel] = processor
+
+            # Publish with a single reference assignment, never cleared, so a
+            # later reload simply supersedes one that was not picked up yet
+            self._reloads += 1
+            self._swap = HandlerSwap(
+                generation=self._reloads,
+                published_ns=time.perf_counter_ns(),
+                presentation_service=presentation_service.PresentationService(
+                    theme=self.presentation_service.theme
+                ),
+                processor_class=harmonic_processor.HarmonicProcessor,
+                processors=processors,
+                built_at=built_at,
+            )
+            print(
+                f"[midi] Reloaded {', '.join(modules)}, swapping in at the next message"
+            )
 
-            # Reset state when reloading
-            self.active_notes.clear()
-            self.processors = {1: harmonic_processor.HarmonicProcessor(n_harmonics=8)}
-            print("[midi] Handler modules reloaded and state reset")
+            # Nothing is processing messages, swap right away
+            if not self.running:
+                self._apply_swap(self._swap)
         except Exception as e:
             print(f"[midi] Error reloading handler: {e}")
 
-    def clamp_note(self, n):
-        """Clamp note to valid MIDI range"""
-        return n % 127
+    def _apply_swap(self, swap):
+        """Swap in a reloaded handler (MIDI thread), keeping notes and positions"""
+        start = time.perf_counter_ns()
+        # Marked applied first, so a failing swap is not retried on every message
+        self._swap_generation = swap.generation
+        processors = swap.processors
+        for channel, old in self.processors.items():
+            processor = processors.get(channel)
+            if processor is None:
+                # Channel first played after the reload was built
+                processors[channel] = old
+                continue
+            # Catch up with notes processed while the reload was being built
+            processor.automaton.advance(old.automaton.steps - swap.built_at[channel])
+            processor.index = old.index
+
+        # active_notes is kept, so sounding notes still get their note-offs
+        self.presentation_service = swap.presentation_service
+        self.processor_class = swap.processor_class
+        self.processors = processors
+
+        done = time.perf_counter_ns()
+        self.swap_stats["swaps"] += 1
+        self.swap_stats["last_wait_us"] = (start - swap.published_ns) / 1000
+        self.swap_stats["last_swap_us"] = (done - start) / 1000
+        print(
+            f"[midi] Handler swapped in {self.swap_stats['last_swap_us']:.1f} us "
+            f"({self.swap_stats['last_wait_us']:.1f} us after reload)"
+        )
 
     def _process_loop(self):
         """Main MIDI processing loop"""
-        while self.running:
+        while True:
             try:
-                # Process all pending MIDI messages
-                for msg in self.inport.iter_pending():
-                    self._process_message(msg)
+                # Process all pending MIDI messages, one pass over every input.
+                # Ports are drained in turn, so messages from different ports
+                # lose their relative order (pending messages carry no
+                # receive time to merge them by)
+                for index, inport in enumerate(self.inports):
+                    for msg in inport.iter_pending():
+                        self._process_message(msg, time.perf_counter_ns(), index)
+
+                if self.thinner:
+                    self._flush_thinned()
+                # Resets posted since, and the stop sentinel
+                if not self._run_posted():
+                    break
 
                 # Small sleep to prevent busy waiting
                 time.sleep(0.001)
@@ -130,33 +413,409 @@ class MidiService:
                 print(f"[midi] Error in processing loop: {e}")
                 time.sleep(0.01)  # Longer sleep on error
 
-    def _process_message(self, msg):
-        """Process a single MIDI message using integrated handler logic"""
-        try:
-            # Process through integrated handler logic
-            out_msgs = self._process_with_handler(msg)
-
-            if out_msgs is None:
-                # Pass through unchanged
-                self.outport.send(msg)
+    def _run_posted(self):
+        """Poll mode: run queued resets, False once the stop sentinel is reached"""
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return True
+            if item is None:
+                return False
+            item()
+
+    def _flush_thinned(self):
+        """
+        Send thinned values whose window is over, returns the seconds until
+        the next one is due (None when nothing is held)
+        """
+        thinner = self.thinner
+        next_due = thinner.next_due
+        if next_due is None:
+            return None
+        now = time.perf_counter_ns()
+        if now >= next_due:
+            thinner.flush_due(now)
+            next_due = thinner.next_due
+            if next_due is None:
+                return None
+        return (next_due - now) / 1e9
+
+    def _callback_loop(self):
+        """MIDI processing loop woken by the input port's receive callback"""
+        get = self._queue.get
+        thinner = self.thinner
+        while True:
+            # Blocks without polling until a message (or the stop sentinel)
+            # arrives, or a thinned value is due
+            if thinner is None:
+                item = get()
+            else:
+                try:
+                    item = get(timeout=self._flush_thinned())
+                except queue.Empty:
+                    continue
+            if item.__class__ is not tuple:
+                # A posted reset, or the stop sentinel
+                if item is None:
+                    break
+                item()
+                continue
+            self._process_message(item[1], item[0], item[2])
+
+    def _raw_loop(self):
+        """Callback loop for raw mode, items carry byte lists instead of messages"""
+        get = self._queue.get
+        thinner = self.thinner
+        while True:
+            if thinner is None:
+                item = get()
             else:
-                # Send processed messages
-                for out_msg in out_msgs:
-                    self.outport.send(out_msg)
+                try:
+                    item = get(timeout=self._flush_thinned())
+                except queue.Empty:
+                    continue
+            if item.__class__ is not tuple:
+                if item is None:
+                    break
+                item()
+                continue
+            self._process_raw(item[1], item[0], item[2])
+
+    def _receive(self, msg, port=0):
+        """Input port callback (backend thread): stamp ingress and wake the worker"""
+        self._queue.put((time.perf_counter_ns(), msg, port))
+
+    def _receive_raw(self, event, data=None, port=0):
+        """rtmidi callback (backend thread): event is ([status, data...], delta time)"""
+        self._queue.put((time.perf_counter_ns(), event[0], port))
+
+    def get_metrics(self):
+        """Latency percentiles and message rates, None when metrics are off"""
+        if not self.metrics:
+            return None
+        report = self.metrics.report()
+        report["swaps"] = dict(self.swap_stats)
+        report["scheduler"] = self.scheduler.get_stats()
+        if self.thinner:
+            report["thinning"] = self.thinner.get_stats()
+        # Port backends with their own counters (network peers)
+        backend_stats = getattr(self.port_backend, "get_stats", None)
+        if backend_stats:
+            report["backend"] = backend_stats()
+        return report
+
+    def _process_message(self, msg, received=None, port=0):
+        """Process a single MIDI message from an input port using integrated handler logic"""
+        # Everything but notes skips the handler, unless journaled for replay
+        msg_type = msg.type
+        if msg_type != "note_on" and msg_type != "note_off" and not self.journal:
+            self._pass_through(msg, received, port)
+            return
+
+        # Pick up a reloaded handler between messages, a single reference read
+        swap = self._swap
+        if swap is not None and swap.generation != self._swap_generation:
+            self._pick_up_swap(swap)
+
+        metrics = self.metrics
+        journal = self.journal
+        if journal:
+            # Captured first, the handler rewrites notes in place
+            in_bytes = msg.bytes()
+        # Output port of the message's route, read before the handler remaps it
+        channel = getattr(msg, "channel", None)
+        if channel is None:
+            outport = self.outports[self.routing.system_output(port)]
+        else:
+            route = self.routing.lookup(port, channel)
+            outport = self.outports[route.output]
+            thinner = self.thinner
+            if thinner is not None and thinner.next_due is not None:
+                # Held bend and pressure go out before the note they lead into
+                thinner.flush_target(route.target)
+        try:
+            out_msgs = self.process(msg, port)
+            if metrics:
+                processed = time.perf_counter_ns()
+
+            # Send processed messages, timed ones go to the scheduler
+            send = outport.send
+            for out_msg in out_msgs:
+                if out_msg.__class__ is Scheduled:
+                    self.scheduler.schedule(out_msg.delay, send, out_msg.msg)
+                else:
+                    send(out_msg)
+            if metrics:
+                sent = time.perf_counter_ns()
 
         except Exception as e:
             # Keep ports alive on handler errors
             print(f"[midi] Error processing message: {e}")
+            self._display = None
             # Still send the original message to keep MIDI flowing
             try:
-                self.outport.send(msg)
+                outport.send(msg)
+            except:
+                pass
+            out_msgs = [msg]
+            if metrics:
+                processed = sent = time.perf_counter_ns()
+
+        if journal:
+            self._journal_event(journal, in_bytes, received, out_msgs, port)
+
+        # UI is updated only once the output is on its way
+        display = self._display
+        if display is not None:
+            self._display = None
+            try:
+                self.ui_callback(*display)
+            except Exception as e:
+                print(f"[midi] Error updating UI: {e}")
+
+        if metrics:
+            metrics.record(msg, received, processed, sent, time.perf_counter_ns())
+
+    def _pass_through(self, msg, received, port):
+        """
+        Fast path for non-note messages: sent on the route's output and
+        channel, optionally thinned, with no handler, UI update or list
+        """
+        channel = getattr(msg, "channel", None)
+        send_now = True
+        if channel is None:
+            outport = self.outports[self.routing.system_output(port)]
+        else:
+            route = self.routing.lookup(port, channel)
+            outport = self.outports[route.output]
+            if route.channel != channel:
+                msg.channel = route.channel
+            thinner = self.thinner
+            if thinner is not None:
+                send_now = thinner.thin_message(
+                    route.target, msg, time.perf_counter_ns(), outport.send
+                )
+        if send_now:
+            try:
+                outport.send(msg)
+            except Exception as e:
+                print(f"[midi] Error sending message: {e}")
+
+        metrics = self.metrics
+        if metrics:
+            now = time.perf_counter_ns()
+            metrics.record(msg, received, now, now, now)
+
+    def _pass_through_raw(self, data, received, port):
+        """_pass_through() for raw bytes, without creating a Message"""
+        status = data[0]
+        spec = SPEC_BY_STATUS.get(status)
+        if spec is None or (status != 0xF0 and len(data) != spec["length"]):
+            # Ignore invalid messages, like mido's rtmidi callback
+            return
+        send_now = True
+        if status < 0xF0:
+            route = self.routing.lookup(port, status & 0x0F)
+            channel = route.channel
+            data[0] = status & 0xF0 | channel
+            send = self._raw_sends[route.output]
+            thinner = self.thinner
+            if thinner is not None:
+                send_now = thinner.thin_bytes(
+                    route.target, data, time.perf_counter_ns(), send
+                )
+        else:
+            channel = None
+            send = self._raw_sends[self.routing.system_output(port)]
+        if send_now:
+            try:
+                send(data)
+            except Exception as e:
+                print(f"[midi] Error sending message: {e}")
+
+        metrics = self.metrics
+        if metrics:
+            now = time.perf_counter_ns()
+            metrics.record_event(channel, spec["type"], received, now, now, now)
+
+    def _journal_event(self, journal, in_bytes, received, out_msgs, port=0):
+        """Journal an input and its outputs with its route's automaton state"""
+        now = time.perf_counter_ns()
+        status = in_bytes[0]
+        if status < 0xF0:
+            channel = status & 0x0F
+            processor = self.processors.get(
+                self.routing.lookup(port, channel).processor
+            )
+        else:
+            channel = processor = None
+        if processor is not None:
+            steps = processor.automaton.steps
+            index = processor.index
+        else:
+            steps = 0
+            index = None
+        journal.record(
+            INPUT,
+            now if received is None else received,
+            in_bytes,
+            channel,
+            steps,
+            index,
+            port,
+        )
+        for out_msg in out_msgs:
+            if out_msg.__class__ is Scheduled:
+                out_msg = out_msg.msg
+            journal.record(OUTPUT, now, out_msg.bytes(), channel, steps, index, port)
+
+    def _pick_up_swap(self, swap):
+        try:
+            self._apply_swap(swap)
+        except Exception as e:
+            print(f"[midi] Error swapping in reloaded handler: {e}")
+
+    def _process_raw(self, data, received=None, port=0):
+        """
+        Raw mode: note-on/off straight from the status and data bytes, the same
+        handling as _process_with_handler without creating Messages, and other
+        messages passed through as bytes. Delayed or journaled messages are
+        parsed and go through _process_message.
+        """
+        status = data[0]
+        kind = status >> 4
+        if kind != 0x9 and kind != 0x8 and not self.journal:
+            self._pass_through_raw(data, received, port)
+            return
+        # Delayed, journaled and timed-output notes take the mido path too
+        if (
+            len(data) != 3
+            or (kind != 0x9 and kind != 0x8)
+            or self.note_delay
+            or self.journal
+            or self.processor_class.timed
+        ):
+            try:
+                msg = mido.Message.from_bytes(data)
+            except ValueError:
+                # Ignore invalid messages, like mido's rtmidi callback
+                return
+            self._process_message(msg, received, port)
+            return
+
+        swap = self._swap
+        if swap is not None and swap.generation != self._swap_generation:
+            self._pick_up_swap(swap)
+
+        metrics = self.metrics
+        out = self._raw_out
+        channel = status & 0x0F
+        note = data[1]
+        velocity = data[2]
+        is_off = kind == 0x8 or velocity == 0
+        route = self.routing.lookup(port, channel)
+        send = self._raw_sends[route.output]
+        thinner = self.thinner
+        if thinner is not None and thinner.next_due is not None:
+            thinner.flush_target(route.target)
+        out_channel = route.channel
+        out_status = status & 0xF0 | out_channel
+        try:
+            processor = self.processors.get(route.processor)
+            if processor is None:
+                processor = self.processor_class(
+                    n_harmonics=8, automaton=self.automaton_config
+                )
+                self.processors[route.processor] = processor
+
+            if is_off:
+                new_note, last = self.active_notes.note_off(channel, note, port)
+                if new_note < 0:
+                    # No mapping, pass through unchanged
+                    new_note = note
+                    last = True
+                if metrics:
+                    processed = time.perf_counter_ns()
+                # Nothing to send while another input still holds the note
+                if last:
+                    out[0] = out_status
+                    out[1] = new_note
+                    out[2] = velocity
+                    send(out)
+            else:
+                new_note = processor.process(note)
+                if not 0 <= new_note <= 127:
+                    new_note = note
+                evicted = self.active_notes.note_on(
+                    channel, note, new_note, port, route.target
+                )
+                if metrics:
+                    processed = time.perf_counter_ns()
+                if evicted >= 0:
+                    out[0] = 0x80 | out_channel
+                    out[1] = evicted
+                    out[2] = 0
+                    send(out)
+                out[0] = out_status
+                out[1] = new_note
+                out[2] = velocity
+                send(out)
+            if metrics:
+                sent = time.perf_counter_ns()
+
+        except Exception as e:
+            print(f"[midi] Error processing message: {e}")
+            new_note = None
+            try:
+                send(data)
             except:
                 pass
+            if metrics:
+                processed = sent = time.perf_counter_ns()
+
+        if self.ui_callback and new_note is not None:
+            try:
+                display_data = self.presentation_service.snapshot_midi_event(
+                    note, new_note, processor, is_off
+                )
+                msg = mido.Message.from_bytes((out_status, new_note, velocity))
+                self.ui_callback(msg, display_data, out_channel)
+            except Exception as e:
+                print(f"[midi] Error updating UI: {e}")
+
+        if metrics:
+            metrics.record_event(
+                out_channel,
+                "note_on" if kind == 0x9 else "note_off",
+                received,
+                processed,
+                sent,
+                time.perf_counter_ns(),
+            )
+
+    def process(self, msg, port=0):
+        """
+        Run a message from an input port through the handler logic, returns
+        the messages to send (Scheduled entries for timed ones)
+        """
+        out_msgs = self._process_with_handler(msg, port)
+        if out_msgs is None:
+            # Pass through unchanged
+            return [msg]
+        return out_msgs
 
-    def _process_with_handler(self, msg):
+    def _process_with_handler(self, msg, port=0):
         """Integrated handler logic (moved from handler.py)"""
-        # Pass through everything that isn't note_on/off
+        channel = getattr(msg, "channel", None)
+        if channel is None:
+            # System messages pass through unchanged
+            return [msg]
+        route = self.routing.lookup(port, channel)
+
+        # Pass through everything else that isn't note_on/off, on the routed channel
         if msg.type not in ("note_on", "note_off"):
+            msg.channel = route.channel
             return [msg]
 
         input_note = msg.note
@@ -166,39 +825,66 @@ class MidiService:
             msg.type == "note_on" and getattr(msg, "velocity", 0) == 0
         )
 
-        # Create a key for this note (channel, original_note)
-        note_key = (msg.channel, msg.note)
-
-        # Get the processor for this channel
-        if msg.channel in self.processors:
-            processor = self.processors[msg.channel]
-        else:
-            processor = HarmonicProcessor(n_harmonics=8)
-            self.processors[msg.channel] = processor
+        # Get the processor for this route
+        processor = self.processors.get(route.processor)
+        if processor is None:
+            processor = self.processor_class(
+                n_harmonics=8, automaton=self.automaton_config
+            )
+            self.processors[route.processor] = processor
 
+        out_msgs = [msg]
         if is_off:
-            # Note off: use the stored note if it exists
-            if note_key in self.active_notes:
-                new_note = self.active_notes[note_key]
+            # Note off: release the latest note this key triggered, if any
+            new_note, last = self.active_notes.note_off(channel, msg.note, port)
+            if new_note >= 0:
                 msg.note = new_note
-                # Clean up the mapping
-                del self.active_notes[note_key]
-            else:
-                # If we don't have a mapping, pass through unchanged
-                pass
+                if not last:
+                    # Another input still holds this note, keep it sounding
+                    out_msgs = []
+            # If we don't have a mapping, pass through unchanged
         else:
             # Note on: generate a new note
             new_note = processor.process(msg.note)
-            self.active_notes[note_key] = self.clamp_note(new_note)
+            if not 0 <= new_note <= 127:
+                # Out of MIDI range, play the original note instead (what the
+                # error path sent before), and hold it so its note-off releases it
+                new_note = input_note
+            evicted = self.active_notes.note_on(
+                channel, msg.note, new_note, port, route.target
+            )
             msg.note = new_note
+            if evicted >= 0:
+                # Too many retriggers of this key, release the oldest
+                out_msgs.insert(
+                    0,
+                    mido.Message(
+                        "note_off", channel=route.channel, note=evicted, velocity=0
+                    ),
+                )
 
-        # Use presentation service to format output
-        display_data = self.presentation_service.format_midi_event(
-            msg, input_note, msg.note, processor, is_off
-        )
+        msg.channel = route.channel
+        if processor.timed and out_msgs:
+            # Echoes, strums and arpeggios from the processor, Scheduled entries
+            out_msgs.extend(processor.timed_output(msg, is_off))
 
-        # Send formatted output to UI
+        # Snapshot for the UI, sent after the output and formatted only if displayed
         if self.ui_callback:
-            self.ui_callback(msg, display_data, msg.channel)
-
-        return [msg]
+            display_data = self.presentation_service.snapshot_midi_event(
+                input_note, msg.note, processor, is_off
+            )
+            self._display = (msg, display_data, msg.channel)
+
+        if self.note_delay:
+            # Note-offs get the same delay, so notes keep their order and
+            # length, and the processor's timed output is delayed with them
+            delay = self.note_delay
+            return [
+                (
+                    Scheduled(m.delay + delay, m.msg)
+                    if m.__class__ is Scheduled
+                    else Scheduled(delay, m)
+                )
+                for m in out_msgs
+            ]
+        return out_msgs
@@ -0,0 +1,486 @@
+"""
+UDP network port backend.
+Stands in for mido's open_input/open_output like the loopback backend, but
+between machines: an output port sends to every peer, and a peer's input port
+opened under the same name receives. Messages are batched into datagrams with
+a per-port sequence number and send time, so receivers put reordered
+datagrams back in order, count lost ones and measure latency per peer. Each
+backend sends under a random session id, so a peer that restarts (at
+sequence 0, from the same address) starts a new stream instead of looking
+like duplicates.
+The socket runs on an asyncio loop in a background thread, inputs deliver on
+that thread like a backend callback.
+
+Datagram: HEADER, then per message EVENT followed by its bytes. Latency uses
+the sender's wall clock, so across machines it is only as good as their
+clock sync (exact on localhost).
+"""
+
+import asyncio
+import os
+import struct
+import threading
+import time
+import zlib
+from loopback_backend import LoopbackInput
+from metrics import Histogram
+
+MAGIC = b"WNDN"
+VERSION = 2
+# magic, version, message count, session id, port id (crc32 of the port name),
+# sequence, send time (wall clock ns)
+HEADER = struct.Struct("<4sBBIIIq")
+# time queued before sending (us), byte length
+EVENT = struct.Struct("<IB")
+MAX_DATAGRAM = 1200  # under common MTUs, no IP fragmentation
+MAX_EVENTS = 255
+MAX_MESSAGE = 255  # longer sysex is dropped
+
+SEQUENCE_MASK = 0xFFFFFFFF
+SEQUENCE_HALF = 1 << 31
+
+DEFAULT_PORT = 5004
+
+
+def port_id(name):
+    return zlib.crc32(name.encode())
+
+
+def parse_address(text, default_host="0.0.0.0"):
+    """ "host:port", ":port" or "port" to a (host, port) tuple"""
+    host, _, port = text.rpartition(":")
+    return (host or default_host, int(port))
+
+
+class PeerStats:
+    COUNTERS = (
+        "packets_in",
+        "events_in",
+        "packets_out",
+        "events_out",
+        "out_of_order",  # held until a gap was filled or given up on
+        "lost",
+        "late",  # arrived after its gap was given up on
+        "duplicate",
+        "restarts",  # peer came back under a new session
+        "stale",  # from a session the peer restarted out of
+        "skewed",  # stamped later than received: the peer's clock is ahead
+    )
+
+    def __init__(self):
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+        # Send to delivery, per message (ns). Send times are the peer's wall
+        # clock, so this includes the clock offset between the two machines
+        self.latency = Histogram()
+        self.started = time.perf_counter()
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started
+        report = dict(self.counters)
+        report["packets_in_per_s"] = report["packets_in"] / elapsed
+        report["packets_out_per_s"] = report["packets_out"] / elapsed
+        report["latency_us"] = self.latency.summary()
+        return report
+
+
+class _Stream:
+    """
+    Sequence tracking for one peer's port. In-order datagrams are delivered
+    at once. Datagrams after a gap are held for up to the reorder window,
+    then the gap is counted lost. A lost datagram that still turns up is
+    delivered without its note-ons, so late note-offs cannot leave notes
+    hanging and late note-ons do not sound out of time.
+    """
+
+    MISSING_KEPT = 256  # given-up sequences remembered to tell late from duplicate
+    RETIRED_KEPT = 16  # earlier sessions remembered to drop their stragglers
+
+    def __init__(self, backend, port, stats, session):
+        self.backend = backend
+        self.port = port
+        self.stats = stats
+        self.session = session
+        self.retired = {}
+        self.expected = None
+        self.held = {}
+        self.missing = {}
+        self.timer = None
+
+    def receive(self, sequence, events):
+        if self.expected is None:
+            self.expected = sequence
+        ahead = (sequence - self.expected) & SEQUENCE_MASK
+        counters = self.stats.counters
+        if ahead == 0:
+            self.backend._deliver(self.port, events, self.stats)
+            self.expected = (sequence + 1) & SEQUENCE_MASK
+            self._drain()
+        elif ahead < SEQUENCE_HALF:
+            if sequence in self.held:
+                counters["duplicate"] += 1
+                return
+            self.held[sequence] = events
+            counters["out_of_order"] += 1
+            if self.timer is None:
+                self.timer = asyncio.get_running_loop().call_later(
+                    self.backend.reorder_window, self._skip_gap
+                )
+        elif sequence in self.missing:
+            del self.missing[sequence]
+            counters["late"] += 1
+            self.backend._deliver(self.port, events, self.stats, late=True)
+        else:
+            counters["duplicate"] += 1
+
+    def restart(self, session):
+        """
+        The peer restarted: deliver what is held from the old session in
+        order, then start over at the new session's first sequence
+        """
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        expected = self.expected
+        for sequence in sorted(self.held, key=lambda s: (s - expected) & SEQUENCE_MASK):
+            self.backend._deliver(self.port, self.held[sequence], self.stats)
+        self.held.clear()
+        self.missing.clear()
+        self.expected = None
+        self.retired[self.session] = None
+        while len(self.retired) > self.RETIRED_KEPT:
+            del self.retired[next(iter(self.retired))]
+        self.session = session
+        self.stats.counters["restarts"] += 1
+
+    def _drain(self):
+        held = self.held
+        while self.expected in held:
+            self.backend._deliver(self.port, held.pop(self.expected), self.stats)
+            self.expected = (self.expected + 1) & SEQUENCE_MASK
+        if not held and self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+    def _skip_gap(self):
+        """Reorder window is over: give up on the gap before the next held datagram"""
+        self.timer = None
+        if not self.held:
+            return
+        expected = self.expected
+        first = min(self.held, key=lambda s: (s - expected) & SEQUENCE_MASK)
+        gap = (first - expected) & SEQUENCE_MASK
+        self.stats.counters["lost"] += gap
+        for offset in range(max(0, gap - self.MISSING_KEPT), gap):
+            self.missing[(expected + offset) & SEQUENCE_MASK] = None
+        while len(self.missing) > self.MISSING_KEPT:
+            del self.missing[next(iter(self.missing))]
+        self.expected = first
+        self._drain()
+        if self.held:
+            self.timer = asyncio.get_running_loop().call_later(
+                self.backend.reorder_window, self._skip_gap
+            )
+
+
+class _Protocol(asyncio.DatagramProtocol):
+    def __init__(self, backend):
+        self.backend = backend
+        self.closed = None
+
+    def connection_made(self, transport):
+        self.closed = asyncio.get_running_loop().create_future()
+
+    def connection_lost(self, exc):
+        self.closed.set_result(None)
+
+    def datagram_received(self, data, addr):
+        self.backend._receive(data, addr)
+
+    def error_received(self, exc):
+        # ICMP errors from peers that are not listening (yet)
+        self.backend.stats["send_errors"] += 1
+
+
+class NetworkOutput:
+    """Output port: queues messages for the next datagram to every peer"""
+
+    def __init__(self, backend, name):
+        self.backend = backend
+        self.name = name
+        self.port_id = port_id(name)
+        self.closed = False
+
+    def send(self, msg):
+        self.backend._enqueue(self.port_id, bytes(msg.bytes()))
+
+    def send_message(self, data):
+        """Send raw bytes like rtmidi's MidiOut.send_message"""
+        # Copied, MidiService reuses its raw output buffer
+        self.backend._enqueue(self.port_id, bytes(data))
+
+    def reset(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class NetworkBackend:
+    """
+    Port backend with the open_input/open_output interface of the mido
+    module, over UDP. bind is the local (host, port), peers the (host, port)
+    addresses outputs send to. Messages sent within batch_window seconds
+    share datagrams (0 batches what is sent before the network thread runs).
+    Unless names is given, every port is a network port, otherwise other
+    names are opened on the fallback backend (mido by default).
+    """
+
+    def __init__(
+        self,
+        bind=("0.0.0.0", DEFAULT_PORT),
+        peers=(),
+        reorder_window=0.005,
+        batch_window=0.0,
+        names=None,
+        fallback=None,
+    ):
+        self.bind = bind
+        self.peers = [tuple(peer) for peer in peers]
+        self.reorder_window = reorder_window
+        self.batch_window = batch_window
+        self.names = names
+        self.fallback = fallback
+        self.address = None
+        self._lock = threading.Lock()
+        self._connections = {}
+        self._names = {}
+        self._outgoing = []
+        self._flush_scheduled = False
+        self._sequences = {}
+        self._streams = {}
+        self._peers = {}
+        self._loop = None
+        self._thread = None
+        self._transport = None
+        self._protocol = None
+        # Random per backend, told apart from an earlier run on the same address
+        self.session = int.from_bytes(os.urandom(4), "little")
+        self.stats = {"invalid": 0, "oversize": 0, "send_errors": 0}
+
+    def start(self):
+        """Bind the socket and start the network thread (done on first open)"""
+        if self._loop is not None:
+            return
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        try:
+            self._transport, self._protocol = asyncio.run_coroutine_threadsafe(
+                loop.create_datagram_endpoint(
+                    lambda: _Protocol(self), local_addr=self.bind
+                ),
+                loop,
+            ).result()
+        except Exception:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+            raise
+        self._thread = thread
+        self._loop = loop
+        self.address = self._transport.get_extra_info("sockname")[:2]
+        print(f"[net] Listening on {self.address[0]}:{self.address[1]}")
+
+    def close(self):
+        """Send what is queued, close the socket and stop the network thread"""
+        loop = self._loop
+        if loop is None:
+            return
+        self._loop = None
+
+        async def shutdown():
+            self._flush()
+            self._transport.close()
+            # The socket is closed in a later callback, stopping the loop
+            # before it runs would leave the port bound
+            await self._protocol.closed
+
+        asyncio.run_coroutine_threadsafe(shutdown(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join()
+        loop.close()
+
+    def _is_network(self, name):
+        return self.names is None or name in self.names
+
+    def _fallback(self):
+        if self.fallback is None:
+            import mido
+
+            self.fallback = mido
+        return self.fallback
+
+    def open_input(self, name=None, virtual=False, callback=None, **kwargs):
+        if not self._is_network(name):
+            return self._fallback().open_input(
+                name, virtual=virtual, callback=callback, **kwargs
+            )
+        self.start()
+        port = LoopbackInput(self, name, callback)
+        key = port_id(name)
+        with self._lock:
+            # Copy on write, so delivery can iterate without taking the lock
+            self._connections[key] = self._connections.get(key, ()) + (port,)
+            self._names[key] = name
+        return port
+
+    def open_output(self, name=None, virtual=False, **kwargs):
+        if not self._is_network(name):
+            return self._fallback().open_output(name, virtual=virtual, **kwargs)
+        self.start()
+        return NetworkOutput(self, name)
+
+    def get_input_names(self):
+        return list(self._names.values())
+
+    def get_output_names(self):
+        return list(self._names.values())
+
+    def _disconnect(self, port):
+        key = port_id(port.name)
+        with self._lock:
+            self._connections[key] = tuple(
+                p for p in self._connections.get(key, ()) if p is not port
+            )
+
+    def _peer(self, addr):
+        stats = self._peers.get(addr)
+        if stats is None:
+            stats = self._peers[addr] = PeerStats()
+        return stats
+
+    def get_stats(self):
+        """Backend counters and per-peer packet rates, loss and latency (us)"""
+        stats = dict(self.stats)
+        stats["peers"] = {
+            f"{host}:{port}": peer.report()
+            for (host, port), peer in list(self._peers.items())
+        }
+        return stats
+
+    # Sending: any thread queues, the network thread batches and sends
+
+    def _enqueue(self, port, data):
+        if len(data) > MAX_MESSAGE:
+            self.stats["oversize"] += 1
+            return
+        loop = self._loop
+        if loop is None:
+            return
+        with self._lock:
+            self._outgoing.append((port, time.time_ns(), data))
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+        if self.batch_window:
+            loop.call_soon_threadsafe(loop.call_later, self.batch_window, self._flush)
+        else:
+            loop.call_soon_threadsafe(self._flush)
+
+    def _flush(self):
+        with self._lock:
+            outgoing = self._outgoing
+            self._outgoing = []
+            self._flush_scheduled = False
+        if not outgoing:
+            return
+        # One sequence of datagrams per port, messages in order
+        by_port = {}
+        for port, queued, data in outgoing:
+            by_port.setdefault(port, []).append((queued, data))
+
+        now = time.time_ns()
+        for port, events in by_port.items():
+            datagram = bytearray(HEADER.size)
+            count = 0
+            for queued, data in events:
+                if (
+                    count == MAX_EVENTS
+                    or len(datagram) + EVENT.size + len(data) > MAX_DATAGRAM
+                ):
+                    self._send_datagram(port, datagram, count, now)
+                    datagram = bytearray(HEADER.size)
+                    count = 0
+                datagram += EVENT.pack(
+                    min((now - queued) // 1000, SEQUENCE_MASK), len(data)
+                )
+                datagram += data
+                count += 1
+            self._send_datagram(port, datagram, count, now)
+
+    def _send_datagram(self, port, datagram, count, now):
+        sequence = self._sequences.get(port, 0)
+        self._sequences[port] = (sequence + 1) & SEQUENCE_MASK
+        HEADER.pack_into(
+            datagram, 0, MAGIC, VERSION, count, self.session, port, sequence, now
+        )
+        for peer in self.peers:
+            try:
+                self._transport.sendto(datagram, peer)
+            except OSError:
+                self.stats["send_errors"] += 1
+                continue
+            counters = self._peer(peer).counters
+            counters["packets_out"] += 1
+            counters["events_out"] += count
+
+    # Receiving: network thread only
+
+    def _receive(self, data, addr):
+        addr = addr[:2]
+        try:
+            magic, version, count, session, port, sequence, sent = HEADER.unpack_from(
+                data
+            )
+            if magic != MAGIC or version != VERSION:
+                raise ValueError
+            events = []
+            offset = HEADER.size
+            for _ in range(count):
+                age, length = EVENT.unpack_from(data, offset)
+                offset += EVENT.size
+                events.append((sent - age * 1000, data[offset : offset + length]))
+                offset += length
+            if offset > len(data):
+                raise ValueError
+        except (struct.error, ValueError):
+            self.stats["invalid"] += 1
+            return
+
+        stats = self._peer(addr)
+        stats.counters["packets_in"] += 1
+        stream = self._streams.get((addr, port))
+        if stream is None:
+            stream = self._streams[(addr, port)] = _Stream(self, port, stats, session)
+        elif session != stream.session:
+            if session in stream.retired:
+                stats.counters["stale"] += 1
+                return
+            stream.restart(session)
+        stream.receive(sequence, events)
+
+    def _deliver(self, port, events, stats, late=False):
+        ports = self._connections.get(port, ())
+        latency = stats.latency
+        stats.counters["events_in"] += len(events)
+        now = time.time_ns()
+        for queued, data in events:
+            if late and data[0] & 0xF0 == 0x90 and len(data) == 3 and data[2]:
+                continue
+            if queued > now:
+                stats.counters["skewed"] += 1
+                latency.record(0)
+            else:
+                latency.record(now - queued)
+            for input_port in ports:
+                input_port._deliver_bytes(data)
@@ -3,71 +3,236 @@ Presentation service for formatting processor data for UI display.
 """
 
 from dataclasses import dataclass
+from typing import NamedTuple
+import functools
 import re
-from themes.ayu.dark import syntax, editor
+from theme_compiler import DEFAULT_THEME, class_name, compile_theme_module
+
+# Markup tags (and newlines, which tags never span) in a single scan
+MARKUP_TOKEN = re.compile(r"<(/?)(\w+)>|\n")
+MARKUP_TAG = re.compile(r"</?\w+>")
+
+# Line templates: markup with positional slots, filled with values after rendering
+AUTOMATON_TEMPLATE = "<tag>{:02d}</tag> <operator>{}</operator> <tag>{:02d}</tag> <markup>{:02d}</markup>"
+EVENT_TEMPLATE = "<tag>{:02d}</tag> <operator>→</operator> <tag>{:02d}</tag>"
+
+# Structured UI events, rendered into the same lines by index.html:
+#   [EVENT_NOTE_OFF, input, output]
+#   [EVENT_NOTE_ON, input, output, counter, operator, operand, value, index, *harmonics]
+#   [EVENT_HTML, rendered html]
+EVENT_NOTE_OFF = 0
+EVENT_NOTE_ON = 1
+EVENT_HTML = 2
+
+
+class NoteSnapshot(NamedTuple):
+    """Immutable copy of the fields a note event line displays"""
+
+    input_note: int
+    output_note: int
+    counter: int
+    operator: str
+    operand: int
+    value: int
+    index: int
+    harmonics: tuple
+    is_off: bool
 
 
 @dataclass
 class DisplayData:
     """Simple display data"""
 
-    content: str
+    content: str = None
+    # Optional template and slot values, rendered without re-parsing the markup
+    template: str = None
+    values: tuple = ()
+    # Optional snapshot, formatted only when a consumer displays the line
+    snapshot: NoteSnapshot = None
+
+
+@functools.lru_cache(maxsize=None)
+def open_span(tag):
+    """Precompiled opening span for a tag, styled by the theme stylesheet"""
+    return f'<span class="{class_name(tag)}">'
+
+
+def render_tags(text, escape_braces=False):
+    """
+    Single-pass markup renderer. Each closing tag is paired with the innermost
+    open tag of the same name on the same line, unpaired tags are left as is.
+    """
+    tokens = list(MARKUP_TOKEN.finditer(text))
+    spans = [None] * len(tokens)
+    pending = {}
+    for i, match in enumerate(tokens):
+        closing, tag = match.groups()
+        if tag is None:
+            # Newline: tags never pair across lines
+            pending.clear()
+        elif not closing:
+            pending.setdefault(tag, []).append(i)
+        elif pending.get(tag):
+            spans[pending[tag].pop()] = open_span(tag)
+            spans[i] = "</span>"
+
+    parts = []
+    last = 0
+    for match, span in zip(tokens, spans):
+        if span is not None:
+            if escape_braces:
+                span = span.replace("{", "{{").replace("}", "}}")
+            parts.append(text[last : match.start()])
+            parts.append(span)
+            last = match.end()
+    parts.append(text[last:])
+    return "".join(parts)
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_template(template):
+    """Render a template's markup once, leaving its slots to be filled"""
+    return render_tags(template, escape_braces=True)
+
+
+@functools.lru_cache(maxsize=None)
+def harmonics_template(n_harmonics, index):
+    """Harmonic list with the current index highlighted"""
+    return "".join(
+        "<markup>[</markup>{:02d}<markup>]</markup>" if i == index else " {:02d} "
+        for i in range(n_harmonics)
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def processor_template(n_harmonics, index):
+    return f"{AUTOMATON_TEMPLATE} <regexp>|</regexp> {harmonics_template(n_harmonics, index)}"
+
+
+@functools.lru_cache(maxsize=None)
+def midi_event_template(n_harmonics, index, is_off):
+    if is_off:
+        return f"<comment>{EVENT_TEMPLATE}</comment>"
+    return f"<fg>{EVENT_TEMPLATE} <regexp>|</regexp> {processor_template(n_harmonics, index)}</fg>"
 
 
 class PresentationService:
     """Handles formatting of processor data for UI display"""
 
-    def __init__(self):
-        pass
+    def __init__(self, theme=DEFAULT_THEME):
+        self.theme = theme
+
+    def _automaton_values(self, automaton):
+        state = automaton.current_state
+        return (state.counter, state.operator, state.operand, automaton.value)
 
     def format_automaton(self, automaton) -> DisplayData:
         """Format automaton data for display"""
-        content = f"<tag>{automaton.current_state.counter:02d}</tag> <operator>{automaton.current_state.operator}</operator> <tag>{automaton.current_state.operand:02d}</tag> <markup>{automaton.value:02d}</markup>"
-        return DisplayData(content=f"{content}")
+        values = self._automaton_values(automaton)
+        return DisplayData(
+            content=AUTOMATON_TEMPLATE.format(*values),
+            template=AUTOMATON_TEMPLATE,
+            values=values,
+        )
 
     def format_harmonic_processor(self, processor) -> DisplayData:
         """Format harmonic processor data for display"""
         # Format harmonics with current index highlighted
-        harmonics_display = []
-        for i, h in enumerate(processor.harmonics):
-            if i == processor.index:
-                harmonics_display.append(f"<markup>[</markup>{h:02d}<markup>]</markup>")
-            else:
-                harmonics_display.append(f" {h:02d} ")
-        harmonics_display = "".join(harmonics_display)
-
-        # Use the automaton formatter
-        automaton_data = self.format_automaton(processor.automaton)
-        content = f"{automaton_data.content} <regexp>|</regexp> {harmonics_display}"
-        return DisplayData(content=f"{content}")
+        template = processor_template(len(processor.harmonics), processor.index)
+        values = self._automaton_values(processor.automaton) + tuple(
+            processor.harmonics
+        )
+        return DisplayData(
+            content=template.format(*values), template=template, values=values
+        )
+
+    def snapshot_midi_event(
+        self, input_note: int, output_note: int, processor, is_off: bool = False
+    ) -> DisplayData:
+        """Capture a MIDI event without formatting it (cheap, for the MIDI thread)"""
+        automaton = processor.automaton
+        return DisplayData(
+            snapshot=NoteSnapshot(
+                input_note,
+                output_note,
+                automaton.counter,
+                automaton.operator,
+                automaton.operand,
+                automaton.value,
+                processor.index,
+                processor.harmonics,
+                is_off,
+            )
+        )
+
+    def _snapshot_template(self, snapshot):
+        template = midi_event_template(
+            len(snapshot.harmonics), snapshot.index, snapshot.is_off
+        )
+        values = (snapshot.input_note, snapshot.output_note)
+        if not snapshot.is_off:
+            values += snapshot[2:6] + tuple(snapshot.harmonics)
+        return template, values
+
+    def format_snapshot(self, display_data: DisplayData) -> DisplayData:
+        """Format a snapshot DisplayData into template, values and content"""
+        if display_data.content is None and display_data.snapshot is not None:
+            template, values = self._snapshot_template(display_data.snapshot)
+            display_data.template = template
+            display_data.values = values
+            display_data.content = template.format(*values)
+        return display_data
 
     def format_midi_event(
         self, msg, input_note: int, output_note: int, processor, is_off: bool = False
     ) -> DisplayData:
         """Format a MIDI event for display"""
-        processor_info = self.format_harmonic_processor(processor)
-
-        content = f"<tag>{input_note:02d}</tag> <operator>→</operator> <tag>{output_note:02d}</tag>"
-        if not is_off:
-            content += f" <regexp>|</regexp> {processor_info.content}"
-
-        tag = "fg" if not is_off else "comment"
-        return DisplayData(content=f"<{tag}>{content}</{tag}>")
+        return self.format_snapshot(
+            self.snapshot_midi_event(input_note, output_note, processor, is_off)
+        )
 
     def render_markup(self, text):
         """Render markup tags in text"""
-        while True:
-            # Find the first complete tag pair (innermost)
-            match = re.search(r"<(\w+)>(.*?)</\1>", text)
-            if not match:
-                break
-
-            tag = match.group(1)
-            content = match.group(2)
-            style = syntax.get(tag, "")
-
-            # Replace the tag with HTML
-            replacement = f'<span style="{style}">{content}</span>'
-            text = text.replace(match.group(0), replacement)
-
-        return text
+        return render_tags(text)
+
+    def render_template(self, template, values):
+        """Render a template by filling the slots of its precompiled HTML"""
+        return compile_template(template).format(*values)
+
+    def render_text(self, display_data):
+        """Render DisplayData as plain text, with markup tags stripped"""
+        self.format_snapshot(display_data)
+        return MARKUP_TAG.sub("", display_data.content)
+
+    def encode(self, display_data):
+        """
+        Encode DisplayData (or a markup string) as a structured UI event. Note
+        snapshots become small arrays of numbers formatted by the page, anything
+        else is sent rendered.
+        """
+        if isinstance(display_data, str):
+            return (EVENT_HTML, self.render_markup(display_data))
+        snapshot = display_data.snapshot
+        if display_data.template is None and snapshot is not None:
+            if snapshot.is_off:
+                return (EVENT_NOTE_OFF, snapshot.input_note, snapshot.output_note)
+            return (EVENT_NOTE_ON,) + snapshot[:7] + tuple(snapshot.harmonics)
+        return (EVENT_HTML, self.render(display_data))
+
+    def theme_css(self, reload=False):
+        """Stylesheet of the current theme, for the page"""
+        return compile_theme_module(self.theme, reload)
+
+    def set_theme(self, theme):
+        """Switch theme and return its stylesheet, rendered markup is unchanged"""
+        css = compile_theme_module(theme, reload=True)
+        self.theme = theme
+        return css
+
+    def render(self, display_data):
+        """Render DisplayData, using its template or snapshot when it has one"""
+        if display_data.template is None and display_data.snapshot is not None:
+            return self.render_template(*self._snapshot_template(display_data.snapshot))
+        if display_data.template is not None:
+            return self.render_template(display_data.template, display_data.values)
+        return self.render_markup(display_data.content)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Offline renderer for MIDI files.
+Streams each track of a .mid file through the MidiService note handling
+(same note-on/note-off pairing as live) as fast as the CPU allows, and
+writes the transformed file into an output directory.
+
+    python render_midi.py song.mid library/ -o rendered/
+"""
+
+import argparse
+import os
+import struct
+import time
+from mido import MidiTrack
+from mido.midifiles.meta import meta_charset
+from mido.midifiles.midifiles import (
+    read_file_header,
+    read_track,
+    write_chunk,
+    write_track,
+)
+from midi_service import MidiService
+
+MIDI_EXTENSIONS = (".mid", ".midi")
+
+
+def render_file(in_path, out_path, charset="latin1"):
+    """
+    Render one file track by track, so only a single track is held in memory.
+    Returns the number of events processed.
+    """
+    # Fresh service per file: processors and note pairing start from scratch
+    service = MidiService()
+    events = 0
+
+    with open(in_path, "rb") as infile, open(out_path, "wb") as outfile:
+        with meta_charset(charset):
+            file_type, num_tracks, ticks_per_beat = read_file_header(infile)
+            write_chunk(
+                outfile,
+                b"MThd",
+                struct.pack(">hhh", file_type, num_tracks, ticks_per_beat),
+            )
+
+            for _ in range(num_tracks):
+                out_track = MidiTrack()
+                for msg in read_track(infile):
+                    delta = msg.time
+                    try:
+                        out_msgs = service.process(msg)
+                    except Exception as e:
+                        # Same fallback as live: keep the original message
+                        print(f"[render] Error processing message: {e}")
+                        out_msgs = [msg]
+
+                    # Delta time belongs to the first message only
+                    for out_msg in out_msgs:
+                        if out_msg.time != delta:
+                            out_msg = out_msg.copy(time=delta)
+                        out_track.append(out_msg)
+                        delta = 0
+                    events += 1
+
+                write_track(outfile, out_track)
+
+    return events
+
+
+def find_midi_files(paths):
+    """Expand directories into the MIDI files they contain"""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    if name.lower().endswith(MIDI_EXTENSIONS):
+                        yield os.path.join(root, name), os.path.relpath(
+                            os.path.join(root, name), path
+                        )
+        else:
+            yield path, os.path.basename(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("inputs", nargs="+", help="MIDI files or directories")
+    parser.add_argument("-o", "--output", default="rendered", help="output directory")
+    args = parser.parse_args()
+
+    total_events = 0
+    total_time = 0.0
+    failed = 0
+    for in_path, rel_path in find_midi_files(args.inputs):
+        out_path = os.path.join(args.output, rel_path)
+        os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+
+        start = time.perf_counter()
+        try:
+            events = render_file(in_path, out_path)
+        except Exception as e:
+            # Keep going through the batch on broken files
+            print(f"[render] {in_path}: error: {e!r}")
+            failed += 1
+            continue
+        elapsed = time.perf_counter() - start
+
+        total_events += events
+        total_time += elapsed
+        print(
+            f"[render] {in_path}: {events} events in {elapsed * 1000:.1f} ms "
+            f"({events / elapsed if elapsed else 0:.0f} events/s)"
+        )
+
+    print(
+        f"[render] Total: {total_events} events in {total_time:.2f} s "
+        f"({total_events / total_time if total_time else 0:.0f} events/s), "
+        f"{failed} failed"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Replayer for MidiService event journals.
+Memory-maps a journal written with MidiService(journal_path=...) and re-drives
+its inputs through a fresh service at full speed. By default the outputs and
+automaton state after each input are compared with the recorded ones, so a
+performance can be reproduced exactly, or a code change checked against it.
+
+    python replay_journal.py performance.wjl            # verify
+    python replay_journal.py performance.wjl --drive    # re-drive only, timed
+    python replay_journal.py performance.wjl --routing routes.json
+"""
+
+import argparse
+import time
+import mido
+from journal import INPUT, OUTPUT, RESET, GAP, NONE, JournalReader
+from midi_service import MidiService
+from routing import RoutingTable
+from counting_automaton import load_config
+from scheduler import Scheduled
+
+
+def replay(path, verify=True, max_reports=10, routing=None, automaton=None):
+    """
+    Replay one journal, recorded with the given RoutingTable (single port by
+    default) and automaton description (the default one). Returns (inputs replayed, inputs skipped, mismatches).
+    Truncated inputs (sysex) are passed through live, so they are skipped.
+    Records dropped while recording (a GAP record) leave the state unknown,
+    so outputs after a gap are re-driven but not verified.
+    """
+    # Fresh service without ports: processors and note pairing start from scratch
+    service = MidiService(metrics=False, routing=routing, automaton=automaton)
+    inputs = skipped = mismatches = 0
+    # Outputs and state produced for the current input, checked against the
+    # OUTPUT records that follow it
+    produced = None
+    recorded = []
+
+    def check():
+        nonlocal mismatches
+        if produced is None or not verify:
+            return
+        out_bytes, steps, index = produced
+        expected = [r[0] for r in recorded]
+        state = recorded_state
+        if out_bytes != expected or (steps, index) != state:
+            mismatches += 1
+            if mismatches <= max_reports:
+                print(
+                    f"[replay] Input {inputs}: expected {expected} at {state}, "
+                    f"got {out_bytes} at {(steps, index)}"
+                )
+
+    with JournalReader(path) as journal:
+        for _, steps, kind, port, channel, index, length, data in journal:
+            if kind == OUTPUT:
+                recorded.append((list(data[:length]), steps, index))
+                continue
+
+            if kind == GAP:
+                # The last input's outputs may be among the dropped records
+                if verify:
+                    print(
+                        f"[replay] {steps} records were dropped while recording after "
+                        f"input {inputs}, the rest is not verified"
+                    )
+                verify = False
+            check()
+            produced = None
+            recorded = []
+
+            if kind == RESET:
+                service.active_notes.clear()
+                continue
+            if kind != INPUT:
+                continue
+            if length > len(data):
+                skipped += 1
+                continue
+
+            if port >= len(service.inports):
+                raise ValueError(
+                    f"Journal input port {port} is not routed, replay it with "
+                    "the routing config it was recorded with"
+                )
+            inputs += 1
+            recorded_state = (steps, None if index == NONE else index)
+            msg = mido.Message.from_bytes(data[:length])
+            try:
+                out_msgs = service.process(msg, port)
+            except Exception:
+                # Same as live: the original message is sent on handler errors
+                out_msgs = [msg]
+            if verify:
+                processor = (
+                    None
+                    if channel == NONE
+                    else service.processors.get(
+                        service.routing.lookup(port, channel).processor
+                    )
+                )
+                produced = (
+                    [
+                        (m.msg if m.__class__ is Scheduled else m).bytes()
+                        for m in out_msgs
+                    ],
+                    processor.automaton.steps if processor else 0,
+                    processor.index if processor else None,
+                )
+        check()
+
+    return inputs, skipped, mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("journals", nargs="+", help="journal files")
+    parser.add_argument(
+        "--drive", action="store_true", help="re-drive without verifying outputs"
+    )
+    parser.add_argument(
+        "--routing", help="routing config (JSON) the journals were recorded with"
+    )
+    parser.add_argument(
+        "--automaton",
+        help="automaton description (JSON) the journals were recorded with",
+    )
+    args = parser.parse_args()
+    routing = RoutingTable.load(args.routing) if args.routing else None
+    automaton = load_config(args.automaton) if args.automaton else None
+
+    failed = 0
+    for path in args.journals:
+        start = time.perf_counter()
+        inputs, skipped, mismatches = replay(
+            path, verify=not args.drive, routing=routing, automaton=automaton
+        )
+        elapsed = time.perf_counter() - start
+        rate = inputs / elapsed if elapsed else 0
+        status = "" if args.drive else f", {mismatches} mismatches"
+        print(
+            f"[replay] {path}: {inputs} inputs ({skipped} skipped) in "
+            f"{elapsed * 1000:.1f} ms ({rate:.0f} events/s){status}"
+        )
+        failed += mismatches > 0
+
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
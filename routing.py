@@ -0,0 +1,90 @@
+"""
+Port routing for the MIDI service.
+Maps each (input port, channel) to a Route: the processor it drives (by key,
+so routes can share one), the output port and the output channel. Lookups are
+a list index. Without configuration there is one input and one output and
+every channel keeps its own processor, the single-port behaviour.
+
+Configuration (JSON):
+
+    {
+        "inputs": ["Keys", "Pads"],
+        "outputs": ["Synth A", "Synth B"],
+        "routes": [
+            {"input": "Keys", "channel": 0, "output": "Synth B", "out_channel": 2,
+             "processor": "keys"},
+            {"input": "Pads", "output": "Synth A"}
+        ]
+    }
+
+A route without "channel" applies to all channels of its input, without
+"out_channel" it keeps the input channel and without "processor" each
+(input, channel) gets its own. Unrouted channels go to the first output.
+System messages (clock, sysex) go to the output of the input's channel 0 route.
+"""
+
+import json
+from typing import Any, NamedTuple
+
+CHANNELS = 16
+
+
+class Route(NamedTuple):
+    processor: Any  # key into MidiService.processors
+    output: int  # output port index
+    channel: int  # output channel
+    target: int  # output << 4 | channel, for the voice table
+
+
+class RoutingTable:
+    def __init__(self, inputs, outputs, routes=()):
+        if not inputs or not outputs:
+            raise ValueError("Routing needs at least one input and one output")
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        # Default routes: channels on input 0 are keyed by channel alone, as
+        # before routing existed, other inputs by (port, channel)
+        self.table = [
+            self._route(channel if port == 0 else (port, channel), 0, channel)
+            for port in range(len(self.inputs))
+            for channel in range(CHANNELS)
+        ]
+        for route in routes:
+            self.add(**route)
+
+    @staticmethod
+    def _route(processor, output, channel):
+        return Route(processor, output, channel, output << 4 | channel)
+
+    def _index(self, names, name, kind):
+        try:
+            return names.index(name)
+        except ValueError:
+            raise ValueError(f"Unknown {kind} port in route: {name}") from None
+
+    def add(self, input, output, channel=None, out_channel=None, processor=None):
+        """Route one channel (or all channels) of an input"""
+        port = self._index(self.inputs, input, "input")
+        out = self._index(self.outputs, output, "output")
+        channels = range(CHANNELS) if channel is None else (channel,)
+        for ch in channels:
+            key = processor if processor is not None else (port, ch)
+            self.table[port << 4 | ch] = self._route(
+                key, out, ch if out_channel is None else out_channel
+            )
+
+    def lookup(self, port, channel):
+        return self.table[port << 4 | channel]
+
+    def system_output(self, port):
+        """Output port for channel-less messages from an input"""
+        return self.table[port << 4].output
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config["inputs"], config["outputs"], config.get("routes", ()))
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_config(json.load(f))
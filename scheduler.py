@@ -0,0 +1,131 @@
+"""
+Scheduled output for the MIDI service.
+One thread dispatches timed messages from a heap ordered by due time on the
+perf_counter_ns() clock (monotonic). It waits on a condition until shortly
+before the next event (without holding the GIL) and yields the GIL for the
+last ~0.1 ms instead of spinning, so the MIDI and UI threads are not
+starved. Events typically land within tens of microseconds of their due
+time, without a thread or timer per note.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from typing import Any, NamedTuple
+from metrics import Histogram
+
+
+class Scheduled(NamedTuple):
+    """A message the handler wants sent delay seconds from now"""
+
+    delay: float
+    msg: Any
+
+
+class OutputScheduler:
+    # Condition waits wake up to this early (ns), as they can overshoot by the
+    # timer slack, the rest is waited by yielding the GIL instead of spinning
+    YIELD_NS = 100_000
+
+    def __init__(self):
+        self._heap = []
+        self._cond = threading.Condition()
+        # Held while sending popped events, cancel_all() waits for it and bumps
+        # the generation, so events popped before a cancel are never sent after it
+        self._dispatching = threading.Lock()
+        self._generation = 0
+        self._seq = itertools.count()
+        self.running = False
+        self.thread = None
+        # Dispatch time minus due time, in ns
+        self.jitter = Histogram()
+        self.stats = {"scheduled": 0, "dispatched": 0, "cancelled": 0, "errors": 0}
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop dispatching, dropping pending events"""
+        with self._cond:
+            self.running = False
+            self._cond.notify()
+        if self.thread:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+        self.cancel_all()
+
+    def schedule(self, delay, send, payload):
+        """Call send(payload) delay seconds from now"""
+        due = time.perf_counter_ns() + int(delay * 1e9)
+        with self._cond:
+            heapq.heappush(self._heap, (due, next(self._seq), send, payload))
+            self.stats["scheduled"] += 1
+            # Only an earlier deadline changes how long the thread should sleep
+            if self._heap[0][0] == due:
+                self._cond.notify()
+
+    def cancel_all(self):
+        """Drop every pending event, returns how many were dropped"""
+        with self._dispatching, self._cond:
+            count = len(self._heap)
+            self._heap.clear()
+            self._generation += 1
+            self.stats["cancelled"] += count
+            self._cond.notify()
+        return count
+
+    def pending(self):
+        return len(self._heap)
+
+    def get_stats(self):
+        """Counters, pending events and dispatch jitter percentiles (us)"""
+        stats = dict(self.stats)
+        stats["pending"] = len(self._heap)
+        stats["jitter_us"] = self.jitter.summary()
+        return stats
+
+    def _run(self):
+        heap = self._heap
+        cond = self._cond
+        while True:
+            with cond:
+                while self.running and not heap:
+                    cond.wait()
+                if not self.running:
+                    return
+                due = heap[0][0]
+                wait = due - time.perf_counter_ns()
+                if wait > self.YIELD_NS:
+                    # Woken early by a new earlier event, a cancel or stop
+                    cond.wait((wait - self.YIELD_NS) / 1e9)
+                    continue
+
+            while time.perf_counter_ns() < due:
+                time.sleep(0)
+
+            # Everything due by now, in due then scheduling order
+            with cond:
+                now = time.perf_counter_ns()
+                events = []
+                while heap and heap[0][0] <= now:
+                    events.append(heapq.heappop(heap))
+                generation = self._generation
+
+            for i, (due, _, send, payload) in enumerate(events):
+                with self._dispatching:
+                    if generation != self._generation:
+                        # Cancelled after these were popped
+                        self.stats["cancelled"] += len(events) - i
+                        break
+                    self.jitter.record(time.perf_counter_ns() - due)
+                    try:
+                        send(payload)
+                    except Exception as e:
+                        self.stats["errors"] += 1
+                        print(f"[scheduler] Error sending scheduled message: {e}")
+                    self.stats["dispatched"] += 1
@@ -0,0 +1,38 @@
+"""
+Theme compiler.
+Turns a theme module's `syntax` and `editor` style dicts into one stylesheet
+of short classes, so markup renders to `<span class="t-tag">` and a theme
+can be swapped at runtime by replacing the stylesheet alone.
+"""
+
+import importlib
+
+DEFAULT_THEME = "ayu.dark"
+CLASS_PREFIX = "t-"
+
+
+def class_name(tag):
+    """CSS class of a markup tag, the same for every theme"""
+    return CLASS_PREFIX + tag
+
+
+def load_theme(name=DEFAULT_THEME, reload=False):
+    """Import themes/<name>.py (dotted, e.g. "ayu.dark"), re-reading it if asked"""
+    module = importlib.import_module(f"themes.{name}")
+    if reload:
+        module = importlib.reload(module)
+    return module
+
+
+def compile_theme(syntax, editor=None):
+    """Stylesheet with one rule per tag, syntax styles taking precedence"""
+    styles = dict(editor or {})
+    styles.update(syntax)
+    return "\n".join(
+        f".{class_name(tag)} {{ {style} }}" for tag, style in styles.items()
+    )
+
+
+def compile_theme_module(name=DEFAULT_THEME, reload=False):
+    theme = load_theme(name, reload)
+    return compile_theme(theme.syntax, getattr(theme, "editor", None))
@@ -0,0 +1,156 @@
+"""
+Rate thinning for continuous controller traffic.
+Per output port, channel, message type and controller (or key), a value equal
+to the last one sent is dropped, and values arriving within the type's window
+after a send are coalesced: only the latest is kept and sent when the window
+ends, so a sweep always lands on its final value. Held values are flushed by
+the MIDI thread between messages (or when it waits for one until next_due),
+and before the next note on their channel, so a note never overtakes the
+bend or pressure sent ahead of it.
+Clock, notes and everything else are never thinned, and neither are the
+controllers that only work as a sequence (data entry, RPN/NRPN selection,
+channel mode).
+"""
+
+import time
+
+# Message types that can be thinned, by status nibble
+TYPES = {
+    "polytouch": 0xA,
+    "control_change": 0xB,
+    "aftertouch": 0xD,
+    "pitchwheel": 0xE,
+}
+UNTHINNED_CONTROLS = frozenset((6, 38, 96, 97, 98, 99, 100, 101, *range(120, 128)))
+
+# Keys are (target << 4 | type) << 7 | number
+TARGET_SHIFT = 11
+
+
+class Thinner:
+    """Thinning state for the MIDI thread (not thread-safe)"""
+
+    def __init__(self, windows):
+        """windows: seconds per message type, e.g. {"control_change": 0.005}"""
+        unknown = set(windows) - set(TYPES)
+        if unknown:
+            raise ValueError(f"Cannot thin message types: {', '.join(sorted(unknown))}")
+        self.windows = {
+            TYPES[name]: int(window * 1e9) for name, window in windows.items()
+        }
+        # key -> [sent at (ns), value sent, pending payload, pending value, send]
+        self._entries = {}
+        # key -> time its held value is due (ns), and the earliest of them
+        self._pending = {}
+        self.next_due = None
+        self.stats = {"passed": 0, "dropped": 0, "coalesced": 0, "flushed": 0}
+
+    def thin_message(self, target, msg, now, send):
+        """
+        True when msg (for output port << 4 | channel target) should be sent
+        now, else it was dropped or is kept to be sent with send(msg) later
+        """
+        kind = TYPES.get(msg.type)
+        window = self.windows.get(kind)
+        if window is None:
+            return True
+        if kind == 0xB:
+            if msg.control in UNTHINNED_CONTROLS:
+                return True
+            number, value = msg.control, msg.value
+        elif kind == 0xE:
+            number, value = 0, msg.pitch + 8192
+        elif kind == 0xA:
+            number, value = msg.note, msg.value
+        else:
+            number, value = 0, msg.value
+        key = (target << 4 | kind) << 7 | number
+        return self._offer(key, window, value, now, send, msg)
+
+    def thin_bytes(self, target, data, now, send):
+        """thin_message() for raw bytes"""
+        kind = data[0] >> 4
+        window = self.windows.get(kind)
+        if window is None:
+            return True
+        if kind == 0xD:
+            number, value = 0, data[1]
+        elif kind == 0xE:
+            number, value = 0, data[1] | data[2] << 7
+        elif kind == 0xB and data[1] in UNTHINNED_CONTROLS:
+            return True
+        else:
+            number, value = data[1], data[2]
+        key = (target << 4 | kind) << 7 | number
+        return self._offer(key, window, value, now, send, data)
+
+    def _offer(self, key, window, value, now, send, payload):
+        entry = self._entries.get(key)
+        if entry is None:
+            self._entries[key] = [now, value, None, value, send]
+            self.stats["passed"] += 1
+            return True
+        if entry[2] is None:
+            if value == entry[1]:
+                self.stats["dropped"] += 1
+                return False
+            if now - entry[0] >= window:
+                entry[0] = now
+                entry[1] = value
+                self.stats["passed"] += 1
+                return True
+            # Within the window: send the latest value when it ends
+            due = entry[0] + window
+            self._pending[key] = due
+            if self.next_due is None or due < self.next_due:
+                self.next_due = due
+        else:
+            self.stats["coalesced"] += 1
+        entry[2] = payload
+        entry[3] = value
+        entry[4] = send
+        return False
+
+    def flush_due(self, now):
+        """Send held values whose window is over"""
+        for key, due in list(self._pending.items()):
+            if due <= now:
+                del self._pending[key]
+                self._flush(key, now)
+        self.next_due = min(self._pending.values(), default=None)
+
+    def flush_target(self, target):
+        """Send what is held for output port << 4 | channel target, ahead of a note"""
+        keys = [key for key in self._pending if key >> TARGET_SHIFT == target]
+        if not keys:
+            return
+        now = time.perf_counter_ns()
+        for key in keys:
+            del self._pending[key]
+            self._flush(key, now)
+        self.next_due = min(self._pending.values(), default=None)
+
+    def _flush(self, key, now):
+        entry = self._entries[key]
+        payload = entry[2]
+        entry[2] = None
+        if entry[3] == entry[1]:
+            # Came back to the value last sent
+            self.stats["dropped"] += 1
+            return
+        entry[0] = now
+        entry[1] = entry[3]
+        self.stats["flushed"] += 1
+        try:
+            entry[4](payload)
+        except Exception as e:
+            print(f"[midi] Error sending thinned message: {e}")
+
+    def clear(self):
+        """Forget sent and held values"""
+        self._entries.clear()
+        self._pending.clear()
+        self.next_due = None
+
+    def get_stats(self):
+        return dict(self.stats)
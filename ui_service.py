@@ -4,21 +4,46 @@ Runs on the main thread and provides thread-safe UI updates.
 """
 
 import webview
+import json
 import threading
 import time
 import re
+from collections import deque
 from typing import Optional, Callable, Union
 from presentation_service import DisplayData, PresentationService
 
 
 class UIService:
-    def __init__(self, presentation_service: PresentationService = None):
+    # Display events are coalesced into one update per pane per frame
+    FRAME_INTERVAL = 0.016
+    QUEUE_SIZE = 4096
+    MAX_LINES_PER_FRAME = 64
+
+    def __init__(
+        self, presentation_service: PresentationService = None, scrollback: int = 2000
+    ):
         self.window = None
+        # Lines kept per pane, older lines are evicted in the page
+        self.scrollback = scrollback
         self.panes = ["pane_0", "pane_1", "pane_2", "pane_3"]
         self.presentation_service = presentation_service or PresentationService()
         self._ui_lock = threading.Lock()
         self.midi_service = None
 
+        # Bounded queue filled by the MIDI thread and drained once per frame.
+        # deque.append/popleft are atomic, so the producer never takes a lock
+        self._events = deque(maxlen=self.QUEUE_SIZE)
+        self._stop_event = threading.Event()
+        self._consumer = None
+        self.stats = {
+            "queued": 0,
+            "dropped": 0,
+            "coalesced": 0,
+            "summarized": 0,
+            "frames": 0,
+            "bytes": 0,
+        }
+
     def set_window(self, window):
         """Set the webview window reference"""
         self.window = window
@@ -48,31 +73,23 @@ class UIService:
 
     def write(self, pane, content):
         """Write content to a specific pane. Accepts either string or DisplayData."""
+        self._append_events({pane: [self.presentation_service.encode(content)]})
+
+    def _append_events(self, batches):
+        """Send structured events for each pane to the page with a single run_js call"""
         with self._ui_lock:
             if not self.window:
                 return
             try:
-                element = self.window.dom.get_element(f"#{pane}")
-
-                if hasattr(content, "content"):
-                    rendered_text = self.presentation_service.render_markup(
-                        content.content
-                    )
-                else:
-                    rendered_text = self.presentation_service.render_markup(content)
-
-                # Use the element's _window to run JavaScript
-                js_code = f"""
-                var element = document.getElementById('{pane}');
-                element.innerHTML += '{rendered_text}<br/>';
-                element.scrollTop = element.scrollHeight;
-                """
-                element._window.run_js(js_code)
+                # JSON is a valid JS literal, so content never breaks the script
+                script = f"appendEvents({json.dumps(batches, separators=(',', ':'))});"
+                self.stats["bytes"] += len(script)
+                self.window.run_js(script)
             except Exception as e:
-                print(f"[ui] Error writing to pane {pane}: {e}")
+                print(f"[ui] Error writing to panes {', '.join(batches)}: {e}")
 
     def update_midi_status(self, msg, display_data, channel):
-        """Update UI with formatted MIDI message information"""
+        """Queue formatted MIDI message information for the next frame (MIDI thread)"""
         if not self.window:
             return
 
@@ -80,7 +97,64 @@ class UIService:
         pane_index = channel % len(self.panes)
         pane = self.panes[pane_index]
 
-        self.write(pane, display_data)
+        # A full deque evicts its oldest entry: display events are dropped, MIDI never is
+        if len(self._events) == self.QUEUE_SIZE:
+            self.stats["dropped"] += 1
+        self._events.append((pane, display_data))
+        self.stats["queued"] += 1
+
+    def flush(self):
+        """Drain queued display events into one update per pane"""
+        batches = {}
+        while True:
+            try:
+                pane, content = self._events.popleft()
+            except IndexError:
+                break
+            batches.setdefault(pane, []).append(content)
+        if not batches:
+            return
+
+        self.stats["frames"] += 1
+        encode = self.presentation_service.encode
+        events = {}
+        for pane, contents in batches.items():
+            # Under overload only the latest lines are sent, the rest summarized
+            skipped = len(contents) - self.MAX_LINES_PER_FRAME
+            pane_events = []
+            if skipped > 0:
+                contents = contents[skipped:]
+                self.stats["summarized"] += skipped
+                pane_events.append(encode(f"<comment>... {skipped} skipped</comment>"))
+            pane_events.extend(encode(content) for content in contents)
+            self.stats["coalesced"] += len(contents) - 1
+            events[pane] = pane_events
+        self._append_events(events)
+
+    def get_stats(self):
+        """Snapshot of display queue counters"""
+        return dict(self.stats, pending=len(self._events))
+
+    def _consume_loop(self):
+        """UI-side consumer, flushes queued display events once per frame"""
+        while not self._stop_event.wait(self.FRAME_INTERVAL):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[ui] Error flushing display events: {e}")
+
+    def set_theme(self, theme):
+        """Switch theme live by replacing the page's stylesheet (also callable from JS)"""
+        try:
+            css = self.presentation_service.set_theme(theme)
+        except Exception as e:
+            print(f"[ui] Error loading theme {theme}: {e}")
+            return False
+        with self._ui_lock:
+            if self.window:
+                self.window.run_js(f"setTheme({json.dumps(css)});")
+        print(f"[ui] Theme switched to {theme}")
+        return True
 
     def notify_reload(self):
         """Notify UI of handler reload"""
@@ -103,11 +177,17 @@ class UIService:
     def on_loaded(self, window):
         """Called when the DOM is ready"""
         self.create_panes()
+        window.run_js(f"setScrollback({self.scrollback});")
+        window.run_js(f"setTheme({json.dumps(self.presentation_service.theme_css())});")
+        self._stop_event.clear()
+        self._consumer = threading.Thread(target=self._consume_loop, daemon=True)
+        self._consumer.start()
         # Demo disabled by default - uncomment for debugging
         # threading.Thread(target=self.run_demo, daemon=True).start()
 
     def on_closing(self, window):
         """Called when the window is about to close"""
+        self._stop_event.set()
         if self.midi_service:
             self.midi_service.all_notes_off()
         return True  # Allow the window to close
@@ -0,0 +1,115 @@
+"""
+Active note table for the MIDI service.
+Preallocated arrays of 16 x 128 keys per port, indexed by
+(port << 4 | channel) << 7 | note, so note-ons and note-offs do not allocate.
+Each input key keeps a small stack of the output notes it triggered
+(retriggers are released last in, first out) and each output note is
+reference counted per output port and channel, so an output shared by two
+inputs is only released when both have been released.
+"""
+
+from array import array
+
+CHANNELS = 16
+NOTES = 128
+KEYS = CHANNELS * NOTES
+
+
+class VoiceTable:
+    # Sounding retriggers kept per input key, beyond that the oldest is evicted
+    DEPTH = 8
+
+    def __init__(self, inputs=1, outputs=1):
+        self.inputs = inputs
+        self.outputs = outputs
+        self.stacks = array("B", [0]) * (inputs * KEYS * self.DEPTH)
+        # Output port << 4 | channel of each stacked note
+        self.targets = array("H", [0]) * (inputs * KEYS * self.DEPTH)
+        self.depths = array("B", [0]) * (inputs * KEYS)
+        self.refcounts = array("H", [0]) * (outputs * KEYS)
+        # Sounding output notes per output port and channel, so panics can
+        # skip silent ones
+        self.target_voices = array("I", [0]) * (outputs * CHANNELS)
+        self.voices = 0
+
+    def __len__(self):
+        return self.voices
+
+    def __contains__(self, key):
+        """(channel, note) on input port 0, or (channel, note, port)"""
+        channel, note, *port = key
+        port = port[0] if port else 0
+        return self.depths[(port << 4 | channel) << 7 | note] > 0
+
+    def note_on(self, channel, note, out_note, port=0, target=None):
+        """
+        Record that input note triggered out_note on target (output port << 4
+        | channel, the input channel on output 0 by default). Returns an output
+        note to release when the key's stack was full and its oldest entry was
+        the last reference to that note, else -1.
+        """
+        if target is None:
+            target = channel
+        key = (port << 4 | channel) << 7 | note
+        depth = self.depths[key]
+        stacks = self.stacks
+        targets = self.targets
+        base = key * self.DEPTH
+        evicted = -1
+        if depth == self.DEPTH:
+            # Drop the oldest retrigger to make room
+            evicted = stacks[base]
+            evicted_target = targets[base]
+            stacks[base : base + depth - 1] = stacks[base + 1 : base + depth]
+            targets[base : base + depth - 1] = targets[base + 1 : base + depth]
+            depth -= 1
+            if not self._release(evicted_target, evicted):
+                evicted = -1
+        stacks[base + depth] = out_note
+        targets[base + depth] = target
+        self.depths[key] = depth + 1
+
+        self.refcounts[target << 7 | out_note] += 1
+        self.target_voices[target] += 1
+        self.voices += 1
+        return evicted
+
+    def note_off(self, channel, note, port=0):
+        """
+        Release the latest output note triggered by input note. Returns
+        (out_note, last), out_note -1 if the key is not sounding and last True
+        when no other input still holds out_note.
+        """
+        key = (port << 4 | channel) << 7 | note
+        depth = self.depths[key]
+        if not depth:
+            return -1, False
+        depth -= 1
+        self.depths[key] = depth
+        index = key * self.DEPTH + depth
+        out_note = self.stacks[index]
+        return out_note, self._release(self.targets[index], out_note)
+
+    def _release(self, target, out_note):
+        """Drop one reference to an output note, True if it was the last"""
+        out_key = target << 7 | out_note
+        count = self.refcounts[out_key] - 1
+        self.refcounts[out_key] = count
+        self.target_voices[target] -= 1
+        self.voices -= 1
+        return count == 0
+
+    def sounding_targets(self):
+        """(output port, channel) pairs with at least one sounding note"""
+        return [
+            (target >> 4, target & 0x0F)
+            for target in range(self.outputs * CHANNELS)
+            if self.target_voices[target]
+        ]
+
+    def clear(self):
+        """Forget every note, in place"""
+        self.depths[:] = array("B", [0]) * (self.inputs * KEYS)
+        self.refcounts[:] = array("H", [0]) * (self.outputs * KEYS)
+        self.target_voices[:] = array("I", [0]) * (self.outputs * CHANNELS)
+        self.voices = 0